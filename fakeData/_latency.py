@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Histogramas de latencia de las llamadas a DynamoDB de los generadores (PutItem, Scan...),
+# con el módulo ingesta/common/latency.py. Es opcional: si el paquete ingesta o sus
+# dependencias (loguru) no están disponibles, los generadores corren igual sin medirlas.
+INGESTA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ingesta")
+
+
+def instrument_latency(resource):
+    # Engancha el cliente del recurso boto3 y vuelca p50/p95/p99 al terminar el script
+    if INGESTA_DIRECTORY not in sys.path:
+        # Al final de la ruta: ingesta no oculta ningún módulo de los generadores
+        sys.path.append(INGESTA_DIRECTORY)
+    try:
+        from common.latency import instrument, report_at_exit
+    except ImportError as e:
+        print(f"Sin histogramas de latencia ({str(e)}).")
+        return resource
+    instrument(resource.meta.client)
+    report_at_exit()
+    return resource
@@ -5,6 +5,7 @@ from faker import Faker
 from datetime import datetime, timedelta
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from _latency import instrument_latency
 
 # Inicializar Faker
 fake = Faker()
@@ -12,6 +13,7 @@ fake = Faker()
 # Configurar DynamoDB
 region_name = "us-east-1"
 dynamodb = boto3.resource("dynamodb", region_name=region_name)
+instrument_latency(dynamodb)
 
 # Tablas DynamoDB
 orders_table = dynamodb.Table("pf_ordenes")
@@ -100,6 +102,8 @@ for order in orders:
                 "comentario": comentario,
                 "stars": Decimal(stars),
                 "last_modification": last_modification,
+                # Fecha de la última escritura: la usa la exportación incremental
+                "last_modified": datetime.now().isoformat(),
             }
 
             # Subir comentario a DynamoDB
@@ -3,10 +3,12 @@ import json
 import random
 from datetime import datetime
 from botocore.exceptions import ClientError
+from _latency import instrument_latency
 
 # Configurar cliente de DynamoDB
 region_name = "us-east-1"
 dynamodb = boto3.resource("dynamodb", region_name=region_name)
+instrument_latency(dynamodb)
 
 # Tablas DynamoDB
 inventarios_table = dynamodb.Table("pf_inventarios")
@@ -5,6 +5,7 @@ from faker import Faker
 import boto3
 from botocore.exceptions import ClientError
 from decimal import Decimal  # Importar Decimal para DynamoDB
+from _latency import instrument_latency
 
 # Inicializar Faker
 fake = Faker()
@@ -18,6 +19,7 @@ output_file_inventories = "inventarios.json"
 # Conexión a DynamoDB
 region_name = "us-east-1"  # Cambia esta región según tu configuración
 dynamodb = boto3.resource("dynamodb", region_name=region_name)
+instrument_latency(dynamodb)
 table = dynamodb.Table("pf_inventarios")  # Cambia por el nombre de tu tabla DynamoDB
 
 # Función para generar un stock aleatorio
@@ -5,6 +5,7 @@ from faker import Faker
 from decimal import Decimal
 from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
+from _latency import instrument_latency
 
 # Inicializar Faker
 fake = Faker()
@@ -12,6 +13,7 @@ fake = Faker()
 # Configurar DynamoDB
 region_name = "us-east-1"
 dynamodb = boto3.resource("dynamodb", region_name=region_name)
+instrument_latency(dynamodb)
 
 # Tablas DynamoDB
 orders_table = dynamodb.Table("pf_ordenes")
@@ -173,6 +175,8 @@ for tenant_id, user_list in tenant_users.items():
                 "order_status": "PENDING",
                 "products": product_list,
                 "total_price": Decimal(str(total_price)),
+                # Fecha de la última escritura: la usa la exportación incremental
+                "last_modified": datetime.now().isoformat(),
             }
 
             # Subir orden a DynamoDB
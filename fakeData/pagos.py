@@ -5,6 +5,7 @@ from faker import Faker
 from decimal import Decimal
 from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
+from _latency import instrument_latency
 
 # Inicializar Faker
 fake = Faker()
@@ -12,6 +13,7 @@ fake = Faker()
 # Configurar DynamoDB
 region_name = "us-east-1"
 dynamodb = boto3.resource("dynamodb", region_name=region_name)
+instrument_latency(dynamodb)
 
 # Tablas DynamoDB
 orders_table = dynamodb.Table("pf_ordenes")
@@ -142,6 +144,8 @@ for (tenant_id, user_id), user_orders in users_orders.items():
                 "total": total_price,
                 "fecha_pago": fecha_pago,
                 "user_info": user_info,
+                # Fecha de la última escritura: la usa la exportación incremental
+                "last_modified": datetime.now().isoformat(),
             }
 
             # Subir pago a DynamoDB
@@ -150,8 +154,8 @@ for (tenant_id, user_id), user_orders in users_orders.items():
             # Actualizar el estado de la orden a 'APPROVED PAYMENT'
             orders_table.update_item(
                 Key={"tenant_id": tenant_id, "order_id": order_id},
-                UpdateExpression="SET order_status = :status",
-                ExpressionAttributeValues={":status": "APPROVED PAYMENT"},
+                UpdateExpression="SET order_status = :status, last_modified = :now",
+                ExpressionAttributeValues={":status": "APPROVED PAYMENT", ":now": datetime.now().isoformat()},
             )
 
             # Agregar al archivo JSON
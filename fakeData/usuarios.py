@@ -5,6 +5,7 @@ from faker import Faker
 import hashlib
 import boto3
 from botocore.exceptions import ClientError
+from _latency import instrument_latency
 
 # Inicializar Faker
 fake = Faker()
@@ -33,6 +34,7 @@ region_name = 'us-east-1'  # Cambia esta línea con la región donde está tu Dy
 
 # Conectar con DynamoDB
 dynamodb = boto3.resource('dynamodb', region_name=region_name)
+instrument_latency(dynamodb)
 table = dynamodb.Table('pf_usuarios')  # Nombre de tu tabla DynamoDB
 
 # Generar datos para 10,000 usuarios
@@ -53,7 +55,9 @@ for _ in range(10000):
         "tenant_id": tenant_id,
         "user_id": user_id,
         "password": password,
-        "creation_date": random_date()
+        "creation_date": random_date(),
+        # Fecha de la última escritura: la usa la exportación incremental
+        "last_modified": datetime.now().isoformat(),
     }
     users.append(user)
 
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# Benchmark del arranque de un trabajo: cuánto cuesta levantar el intérprete, importar
+# el módulo del trabajo y crear su primer cliente AWS, frente a un segundo trabajo en el
+# mismo proceso (como en PIPELINE_ISOLATION=thread) que reutiliza los clientes ya creados.
+# Cada trabajo se mide en un proceso nuevo para que no haya módulos en caché.
+# Uso: python3 benchmarks/bench_cold_start.py [repeticiones]
+
+JOBS = [
+    ("t_ordenes.pull_ordenes", "dynamodb"),
+    ("t_ordenes.load_ordenes", "s3"),
+    ("t_usuarios.pull_usuarios", "dynamodb"),
+    ("t_usuarios.load_usuarios", "s3"),
+    ("load_all", "s3"),
+]
+
+
+def measure(module_name, service):
+    import importlib
+    start = time.perf_counter()
+    importlib.import_module(module_name)
+    imported = time.perf_counter()
+    from common.clients import aws_client
+    aws_client(service, region_name="us-east-1")
+    created = time.perf_counter()
+    aws_client(service, region_name="us-east-1")
+    reused = time.perf_counter()
+    print(f"{(imported - start) * 1000:.1f}\t{(created - imported) * 1000:.1f}\t{(reused - created) * 1000:.3f}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, AWS_ACCESS_KEY_ID="bench", AWS_SECRET_ACCESS_KEY="bench",
+               AWS_DEFAULT_REGION="us-east-1")
+    start = time.perf_counter()
+    for _ in range(repeats):
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter = (time.perf_counter() - start) * 1000 / repeats
+    print(f"Arranque del intérprete: {interpreter:.1f} ms (media de {repeats})")
+    print(f"  {'trabajo':<26} {'import ms':>10} {'1er cliente ms':>15} {'cliente reusado ms':>19} {'total ms':>9}")
+    for module_name, service in JOBS:
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, __file__, "--job", module_name, service], cwd=ROOT, env=env,
+                                    capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+            total = (time.perf_counter() - start) * 1000
+            samples.append([float(value) for value in output.split("\t")] + [total])
+        # Mediana de cada columna
+        columns = [sorted(column)[len(column) // 2] for column in zip(*samples)]
+        print(f"  {module_name:<26} {columns[0]:10.1f} {columns[1]:15.1f} {columns[2]:19.3f} {columns[3]:9.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--job":
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main()
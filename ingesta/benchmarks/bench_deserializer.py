@@ -0,0 +1,74 @@
+import csv
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.deserializer import compile_row_decoder, decode_row
+from common.tables import TABLES
+
+# Micro-benchmark: comprensión original de los pull_* frente al deserializador
+# compilado para un elemento con la forma de pf_ordenes. Se mide solo la
+# deserialización y también deserialización + escritura de la fila CSV, porque
+# con la comprensión original el trabajo de los atributos M/L (repr) ocurre en
+# el writer.
+# Uso: python3 benchmarks/bench_deserializer.py [iteraciones]
+
+ITEM = {
+    "tenant_id": {"S": "wong"},
+    "order_id": {"S": "order_12345"},
+    "tu_id": {"S": "wong#user_4321"},
+    "user_id": {"S": "user_4321"},
+    "user_info": {"M": {
+        "pais": {"S": "Perú"},
+        "ciudad": {"S": "Lima"},
+        "direccion": {"S": "Av. Arequipa 1234"},
+        "codigo_postal": {"S": "15046"},
+    }},
+    "inventory_id": {"S": "inventory_77"},
+    "creation_date": {"S": "2026-10-01T10:15:00"},
+    "shipping_date": {"S": "2026-10-08T10:15:00"},
+    "order_status": {"S": "PENDING"},
+    "products": {"L": [
+        {"M": {"product_id": {"S": f"product_{i}"}, "quantity": {"N": "2"}, "price": {"N": "149.90"}}}
+        for i in range(3)
+    ]},
+    "total_price": {"N": "899.40"},
+}
+
+
+def legacy(item):
+    return {k: list(v.values())[0] for k, v in item.items()}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    compiled = compile_row_decoder(TABLES["pf_ordenes"]["schema"])
+    candidates = [
+        ("comprensión original", legacy),
+        ("decode_row (genérico)", decode_row),
+        ("compile_row_decoder", compiled),
+    ]
+    sink = io.StringIO()
+    writer = csv.writer(sink, delimiter=";")
+
+    def decode_and_write(function):
+        sink.seek(0)
+        sink.truncate()
+        writer.writerow(function(ITEM).values())
+
+    for title, measure in (("deserialización", lambda f: f(ITEM)),
+                           ("deserialización + fila CSV", decode_and_write)):
+        print(f"== {title}")
+        baseline = None
+        for name, function in candidates:
+            seconds = min(timeit.repeat(lambda: measure(function), number=iterations, repeat=5))
+            per_item = seconds / iterations * 1e6
+            baseline = baseline or per_item
+            print(f"{name:<24} {per_item:8.2f} µs/elemento  ({baseline / per_item:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import csv
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.deserializer import compile_row_decoder
+from common.scan import parallel_scan
+from common.tables import TABLES
+from bench_deserializer import ITEM
+
+# Benchmark del prefetch de páginas en el escaneo de un solo segmento. Un cliente
+# simulado tarda LATENCY_MS en devolver cada página (la red) y el consumidor hace el
+# trabajo real de export_table: deserializar y escribir cada fila CSV (la CPU).
+# Sin prefetch ambos tiempos se suman; con prefetch la petición siguiente se solapa.
+# Uso: python3 benchmarks/bench_prefetch.py [páginas] [latencia_ms] [elementos_por_página]
+
+
+class FakeDynamoDB:
+    def __init__(self, pages, latency, items_per_page):
+        self.pages = pages
+        self.latency = latency
+        self.items = [ITEM] * items_per_page
+
+    def scan(self, **request):
+        time.sleep(self.latency)
+        number = request.get("ExclusiveStartKey", {}).get("page", 0) + 1
+        page = {"Items": self.items, "Count": len(self.items)}
+        if number < self.pages:
+            page["LastEvaluatedKey"] = {"page": number}
+        return page
+
+
+def run(dynamodb, prefetch_pages):
+    decode = compile_row_decoder(TABLES["pf_ordenes"]["schema"])
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(ITEM), delimiter=";")
+    start = time.perf_counter()
+    pages = 0
+    for _, page in parallel_scan(dynamodb, "pf_ordenes", prefetch_pages=prefetch_pages):
+        for item in page["Items"]:
+            writer.writerow(decode(item))
+        output.seek(0)
+        output.truncate()
+        pages += 1
+    return pages / (time.perf_counter() - start)
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    items_per_page = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    dynamodb = FakeDynamoDB(pages, latency_ms / 1000, items_per_page)
+
+    # Tiempo de CPU por página, para saber cuánto se puede ocultar como máximo
+    cpu = 1 / run(FakeDynamoDB(pages, 0, items_per_page), 0)
+    print(f"{pages} páginas de {items_per_page} elementos, latencia {latency_ms:.0f} ms, "
+          f"CPU {cpu * 1000:.1f} ms/página")
+    baseline = None
+    for depth in (0, 1, 2, 4):
+        rate = run(dynamodb, depth)
+        baseline = baseline or rate
+        label = "sin prefetch" if depth == 0 else f"prefetch={depth}"
+        print(f"  {label:<14} {rate:7.1f} páginas/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
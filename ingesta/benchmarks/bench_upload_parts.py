@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Benchmark de la lectura de partes en subidas multipart: leer cada parte a un bytes
+# (como la subida reanudable antes del mapeo) frente a vistas memoryview sobre el
+# archivo mapeado con las sumas calculadas sobre esas mismas vistas. Un cliente S3
+# simulado consume el cuerpo como lo haría el envío HTTP (trozos de 64 KB) y, si no
+# recibe el CRC32, lo calcula con una pasada extra como hace botocore.
+# Cada modo corre en su propio proceso para medir su memoria por separado.
+# Uso: python3 benchmarks/bench_upload_parts.py [tamaño_MB] [parte_MB] [hilos]
+
+SEND_BLOCK_BYTES = 64 * 1024
+
+
+class FakeS3:
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "bench"}
+
+    def upload_part(self, Body, ChecksumCRC32=None, **kwargs):
+        if hasattr(Body, "read"):
+            if ChecksumCRC32 is None:
+                crc = 0
+                while chunk := Body.read(1024 * 1024):
+                    crc = zlib.crc32(chunk, crc)
+                Body.seek(0)
+            while Body.read(SEND_BLOCK_BYTES):
+                pass
+        elif ChecksumCRC32 is None:
+            zlib.crc32(Body)
+        return {"ETag": f'"{kwargs["PartNumber"]}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        return {}
+
+
+def anon_rss_mb():
+    # Memoria privada del proceso (sin contar páginas del archivo mapeado, que el kernel recupera)
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_mode(mode, path, part_mb, threads):
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+    from common import resumable
+
+    part_size = part_mb * 1024 * 1024
+    s3 = FakeS3()
+    peak = [anon_rss_mb()]
+    baseline = peak[0]
+    running = True
+
+    def sample():
+        while running:
+            peak[0] = max(peak[0], anon_rss_mb())
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    if mode == "mmap":
+        resumable.UPLOAD_STATE_DIRECTORY = tempfile.mkdtemp()
+        resumable.resumable_upload(s3, path, "bench", "bench.bin", part_size, threads)
+    else:
+        size = os.path.getsize(path)
+
+        def upload_part(number):
+            with open(path, "rb") as source:
+                source.seek((number - 1) * part_size)
+                body = source.read(part_size)
+            return s3.upload_part(Body=io.BytesIO(body), PartNumber=number)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(upload_part, range(1, -(-size // part_size) + 1)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    running = False
+    sampler.join()
+    gigabytes = os.path.getsize(path) / 1024 ** 3
+    print(f"{mode}\t{elapsed:.3f}\t{cpu / gigabytes:.3f}\t{peak[0] - baseline:.1f}")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    part_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    with tempfile.NamedTemporaryFile(suffix=".bin") as staged:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            staged.write(block)
+        staged.flush()
+        print(f"Archivo de {size_mb} MB, partes de {part_mb} MB, {threads} hilos")
+        print(f"  {'modo':<6} {'segundos':>9} {'CPU s/GB':>9} {'RSS anónima MB':>15}")
+        for mode in ("bytes", "mmap"):
+            output = subprocess.run([sys.executable, __file__, "--mode", mode, staged.name, str(part_mb), str(threads)],
+                                    capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+            _, elapsed, cpu, rss = output.split("\t")
+            print(f"  {mode:<6} {float(elapsed):9.2f} {float(cpu):9.2f} {float(rss):15.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--mode":
+        from loguru import logger
+        logger.remove()
+        run_mode(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+    else:
+        main()
@@ -0,0 +1,50 @@
+import os
+import threading
+from loguru import logger
+from common.throttle import AdaptiveRateLimiter
+
+# Presupuesto global de lectura (RCU/s) para exportar varias tablas a la vez; 0 = sin presupuesto
+TOTAL_READ_CAPACITY = float(os.getenv("TOTAL_READ_CAPACITY", "0"))
+
+
+def table_size(dynamodb, table_name):
+    # Tamaño aproximado que publica DynamoDB (se actualiza cada ~6 horas)
+    table = dynamodb.describe_table(TableName=table_name)["Table"]
+    return table.get("TableSizeBytes") or table.get("ItemCount") or 0
+
+
+class CapacityBudget:
+    # Reparte un presupuesto de RCU/s entre las tablas activas en proporción a su tamaño.
+    # Cada tabla recibe su propio limitador AIMD con su parte como techo; cuando una tabla
+    # termina, su parte se redistribuye entre las que siguen escaneando.
+
+    def __init__(self, total_rate, min_share=1.0):
+        self.total_rate = total_rate
+        self.min_share = min_share
+        self.weights = {}
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, sizes):
+        with self._lock:
+            self.weights = {table: max(size, 1) for table, size in sizes.items()}
+            shares = self._shares()
+            self.limiters = {table: AdaptiveRateLimiter(share) for table, share in shares.items()}
+        for table, share in shares.items():
+            logger.info(f"Presupuesto de lectura para '{table}': {share:.1f} RCU/s.")
+        return self.limiters
+
+    def _shares(self):
+        total_weight = sum(self.weights.values())
+        return {table: max(self.min_share, self.total_rate * weight / total_weight)
+                for table, weight in self.weights.items()}
+
+    def release(self, table):
+        with self._lock:
+            self.weights.pop(table, None)
+            if not self.weights:
+                return
+            shares = self._shares()
+        for active_table, share in shares.items():
+            self.limiters[active_table].set_max_rate(share)
+        logger.info(f"'{table}' terminó; presupuesto redistribuido entre {len(shares)} tablas.")
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+from loguru import logger
+from common.watermark import STATE_DIRECTORY
+
+# Cada cuántos segundos se persiste el progreso del escaneo
+CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_INTERVAL_SECONDS", "5"))
+
+
+class ScanCheckpoint:
+    # Progreso de un escaneo: LastEvaluatedKey de cada segmento y el desplazamiento en
+    # bytes del CSV parcial. Solo se registra tras escribir una página completa, por lo
+    # que al reanudar basta truncar el archivo a ese desplazamiento y seguir desde las claves.
+
+    def __init__(self, table_name, state=None, persist=True):
+        self.table_name = table_name
+        # Sin persistencia (p. ej. al escribir directo a S3) el progreso solo vive en memoria
+        self.persist = persist
+        self.path = os.path.join(STATE_DIRECTORY, f"{table_name}.checkpoint.json")
+        self.state = state
+        self._sink = None
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def load(cls, table_name):
+        checkpoint = cls(table_name)
+        if os.path.exists(checkpoint.path):
+            with open(checkpoint.path, encoding="utf-8") as checkpoint_file:
+                checkpoint.state = json.load(checkpoint_file)
+        return checkpoint
+
+    @property
+    def resumable(self):
+        return self.state is not None
+
+    def start(self, **details):
+        # details: salida, segmentos, parámetros del escaneo... lo necesario para reanudar igual
+        self.state = dict(details, segments={}, offset=0, fieldnames=None, rows=0)
+
+    def start_keys(self):
+        return {int(segment): progress["last_key"]
+                for segment, progress in self.state["segments"].items()
+                if not progress["done"]}
+
+    def pending_segments(self):
+        finished = {int(segment) for segment, progress in self.state["segments"].items() if progress["done"]}
+        return [segment for segment in range(self.state["total_segments"]) if segment not in finished]
+
+    def page_done(self, segment, last_key, sink, **extra):
+        self.state["segments"][str(segment)] = {"last_key": last_key, "done": not last_key}
+        self.state.update(extra)
+        self._sink = sink
+        if time.monotonic() - self._last_save >= CHECKPOINT_INTERVAL_SECONDS:
+            self.save()
+
+    def save(self):
+        # Toma la posición actual del archivo de salida: solo debe llamarse entre páginas
+        if self.state is None or not self.persist:
+            return
+        if self._sink is not None:
+            self.state["offset"] = self._sink.position()
+            self.state["fieldnames"] = self._sink.fieldnames
+            self.state["rows"] = self._sink.rows
+        os.makedirs(STATE_DIRECTORY, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(self.state, checkpoint_file)
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+
+    def clear(self):
+        self.state = None
+        if self.persist and os.path.exists(self.path):
+            os.remove(self.path)
+            logger.info(f"Punto de control de '{self.table_name}' eliminado.")
@@ -0,0 +1,33 @@
+import threading
+from loguru import logger
+from common.latency import instrument, report_at_exit
+
+# Sesión y clientes de AWS creados bajo demanda y compartidos por todo el proceso. boto3 se
+# importa recién al pedir el primer cliente (importarlo cuesta ~0,2 s) y cada cliente se crea
+# una sola vez: los clientes de botocore son seguros entre hilos, así que segmentos, tablas
+# y etapas del pipeline que corren en el mismo proceso reutilizan sesión, modelos y conexiones.
+# Cada cliente registra la latencia de sus llamadas (common/latency.py).
+_session = None
+_clients = {}
+_lock = threading.RLock()
+
+
+def session():
+    global _session
+    with _lock:
+        if _session is None:
+            import boto3
+            _session = boto3.session.Session()
+        return _session
+
+
+def aws_client(service, max_pool_connections=10, region_name=None, endpoint_url=None):
+    # Un cliente por servicio, región, endpoint y tamaño de pool de conexiones
+    key = (service, region_name, endpoint_url, max_pool_connections)
+    with _lock:
+        if key not in _clients:
+            from botocore.config import Config
+            _clients[key] = instrument(session().client(service, region_name=region_name, endpoint_url=endpoint_url,
+                                                        config=Config(max_pool_connections=max_pool_connections)))
+            report_at_exit(logger.info)
+        return _clients[key]
@@ -0,0 +1,125 @@
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compresión de los CSV antes de subirlos: "none", "gzip" o "zstd" (si zstandard está instalado).
+# El archivo se parte en bloques independientes que se comprimen en paralelo (zlib y zstd
+# liberan el GIL) y se concatenan: varios miembros gzip (o frames zstd) seguidos forman
+# un flujo válido que cualquier lector descomprime entero.
+COMPRESSION = os.getenv("COMPRESSION", "none").lower()
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+COMPRESSION_BLOCK_MB = int(os.getenv("COMPRESSION_BLOCK_MB", "4"))
+COMPRESSION_WORKERS = int(os.getenv("COMPRESSION_WORKERS", str(os.cpu_count() or 2)))
+
+CODECS = {
+    "gzip": {"suffix": ".gz", "encoding": "gzip"},
+    "zstd": {"suffix": ".zst", "encoding": "zstd"},
+}
+
+
+def active_codec():
+    if COMPRESSION in ("", "none"):
+        return None
+    if COMPRESSION not in CODECS:
+        raise ValueError(f"Compresión no soportada: {COMPRESSION}")
+    if COMPRESSION == "zstd" and zstandard is None:
+        logger.warning("zstandard no está instalado; se usa gzip.")
+        return "gzip"
+    return COMPRESSION
+
+
+def _compress_block(codec, block):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(block)
+    # mtime=0: el mismo contenido produce siempre los mismos bytes
+    return gzip.compress(block, compresslevel=COMPRESSION_LEVEL, mtime=0)
+
+
+class BlockCompressor:
+    # Compresión incremental por bloques: feed() recibe bytes y devuelve, en orden, los
+    # bloques comprimidos ya terminados; finish() comprime el resto y espera a todos.
+    # Como máximo hay 2 * COMPRESSION_WORKERS bloques en vuelo (memoria acotada).
+
+    def __init__(self, codec, block_size=None, workers=COMPRESSION_WORKERS):
+        self.codec = codec
+        self.block_size = block_size or COMPRESSION_BLOCK_MB * 1024 * 1024
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._buffer = bytearray()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._futures = deque()
+        self._max_in_flight = workers * 2
+
+    def feed(self, data):
+        self._buffer += data
+        ready = []
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            ready += self._submit(block)
+        return ready + self._collect(wait=False)
+
+    def _submit(self, block):
+        self.raw_bytes += len(block)
+        self._futures.append(self._pool.submit(_compress_block, self.codec, block))
+        # Si hay demasiados bloques en vuelo se espera al más antiguo
+        ready = []
+        while len(self._futures) > self._max_in_flight:
+            ready.append(self._pop())
+        return ready
+
+    def _pop(self):
+        compressed = self._futures.popleft().result()
+        self.compressed_bytes += len(compressed)
+        return compressed
+
+    def _collect(self, wait):
+        ready = []
+        while self._futures and (wait or self._futures[0].done()):
+            ready.append(self._pop())
+        return ready
+
+    def finish(self):
+        ready = []
+        # Un contenido vacío también produce un miembro (un .gz vacío no es válido)
+        if self._buffer or not self.raw_bytes:
+            ready += self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        ready += self._collect(wait=True)
+        self._pool.shutdown()
+        return ready
+
+    def ratio(self):
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+
+def compress_file(source_path, target_path, codec):
+    compressor = BlockCompressor(codec)
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        while block := source.read(compressor.block_size):
+            for compressed in compressor.feed(block):
+                target.write(compressed)
+        for compressed in compressor.finish():
+            target.write(compressed)
+    return compressor
+
+
+def prepare_upload(file_path, key, extra_args=None):
+    # Devuelve (ruta a subir, clave, ExtraArgs, archivo temporal a borrar o None)
+    codec = active_codec()
+    extra_args = dict(extra_args or {})
+    if codec is None:
+        return file_path, key, extra_args, None
+    compressed_path = file_path + CODECS[codec]["suffix"]
+    compressor = compress_file(file_path, compressed_path, codec)
+    logger.info(f"'{file_path}' comprimido con {codec}: {compressor.raw_bytes / 1024:.1f} KB -> "
+                f"{compressor.compressed_bytes / 1024:.1f} KB ({compressor.ratio():.1f}x).")
+    extra_args["ContentEncoding"] = CODECS[codec]["encoding"]
+    return compressed_path, key + CODECS[codec]["suffix"], extra_args, compressed_path
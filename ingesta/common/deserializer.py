@@ -0,0 +1,177 @@
+import base64
+from decimal import Decimal
+from json.encoder import encode_basestring
+
+# Deserializador de AttributeValue de DynamoDB (formato del cliente de bajo nivel).
+# - deserialize(): valor Python tipado (dict/list/int/Decimal/...), para uso interno.
+# - compile_row_decoder(): función por tabla que produce filas listas para CSV;
+#   los atributos M/L se escriben como JSON (no como repr de Python).
+
+_MISSING = object()
+
+
+def _number(text):
+    if "." in text or "e" in text or "E" in text:
+        return Decimal(text)
+    return int(text)
+
+
+def _binary(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+
+# Valores Python tipados
+def deserialize(value):
+    for tag, raw in value.items():
+        return _TYPED[tag](raw)
+
+
+_TYPED = {
+    "S": str,
+    "N": _number,
+    "BOOL": bool,
+    "NULL": lambda raw: None,
+    "B": bytes,
+    "M": lambda raw: {k: deserialize(v) for k, v in raw.items()},
+    "L": lambda raw: [deserialize(v) for v in raw],
+    "SS": set,
+    "NS": lambda raw: {_number(v) for v in raw},
+    "BS": set,
+}
+
+
+# Texto JSON directo desde AttributeValue, sin pasar por objetos intermedios.
+# Los números conservan su representación exacta.
+def _json_value(value):
+    for tag, raw in value.items():
+        return _JSON[tag](raw)
+
+
+def _json_map(raw):
+    return "{" + ",".join([encode_basestring(k) + ":" + _json_value(v) for k, v in raw.items()]) + "}"
+
+
+def _json_list(raw):
+    return "[" + ",".join([_json_value(v) for v in raw]) + "]"
+
+
+_JSON = {
+    "S": encode_basestring,
+    "N": str,
+    "BOOL": lambda raw: "true" if raw else "false",
+    "NULL": lambda raw: "null",
+    "B": lambda raw: encode_basestring(_binary(raw)),
+    "M": _json_map,
+    "L": _json_list,
+    "SS": lambda raw: "[" + ",".join(encode_basestring(v) for v in raw) + "]",
+    "NS": lambda raw: "[" + ",".join(raw) + "]",
+    "BS": lambda raw: "[" + ",".join(encode_basestring(_binary(v)) for v in raw) + "]",
+}
+
+
+# Celdas CSV: S/N/BOOL se copian tal cual (N ya es texto numérico exacto),
+# las estructuras se escriben como texto JSON. None indica copia directa.
+_CELL = {
+    "S": None,
+    "N": None,
+    "BOOL": None,
+    "NULL": lambda raw: None,
+    "B": _binary,
+    "M": _json_map,
+    "L": _json_list,
+    "SS": _JSON["SS"],
+    "NS": _JSON["NS"],
+    "BS": _JSON["BS"],
+}
+
+
+def decode_cell(value):
+    for tag, raw in value.items():
+        convert = _CELL[tag]
+        return raw if convert is None else convert(raw)
+
+
+def decode_row(item):
+    # Camino genérico para tablas sin esquema
+    return {name: decode_cell(value) for name, value in item.items()}
+
+
+def _field_encoder(spec):
+    # (etiqueta, función que codifica como JSON el valor crudo) de un campo según su tipo esperado
+    if isinstance(spec, dict) and spec:
+        return next(iter(spec)), _structure_encoder(spec)
+    return spec, _JSON[spec]
+
+
+def _structure_encoder(spec):
+    # Función que codifica el valor crudo de un M/L con estructura conocida.
+    # Lanza KeyError/TypeError si el valor no coincide con la estructura
+    # (el llamador recurre entonces al camino genérico).
+    tag, inner = next(iter(spec.items()))
+    if tag == "M":
+        fields = [(encode_basestring(key) + ":", key) + _field_encoder(field_spec)
+                  for key, field_spec in inner.items()]
+
+        def encode_map(raw):
+            if len(raw) != len(fields):
+                raise KeyError
+            return "{" + ",".join([prefix + encode(raw[key][field_tag])
+                                   for prefix, key, field_tag, encode in fields]) + "}"
+        return encode_map
+    if tag == "L":
+        element_tag, encode_element = _field_encoder(inner)
+
+        def encode_list(raw):
+            return "[" + ",".join([encode_element(value[element_tag]) for value in raw]) + "]"
+        return encode_list
+    raise ValueError(f"Tipo anidado no soportado: {tag}")
+
+
+def _with_fallback(encode, fallback):
+    def convert(raw):
+        try:
+            return encode(raw)
+        except (KeyError, TypeError):
+            return fallback(raw)
+    return convert
+
+
+def compile_row_decoder(schema):
+    # Prepara la tabla de columnas del esquema {atributo: tipo}: (nombre, etiqueta, conversión).
+    # El tipo es una etiqueta ("S", "N", "M", ...) o, para estructuras conocidas,
+    # {"M": {subatributo: tipo}} / {"L": tipo_elemento}, que se codifican a JSON
+    # con encoders preparados una vez. Cada atributo conocido se lee por su tipo esperado
+    # sin iterar el AttributeValue; si el tipo no coincide (p.ej. NULL) o aparecen
+    # atributos nuevos se usa decode_cell.
+    if not schema:
+        return decode_row
+
+    columns = []
+    for name, spec in schema.items():
+        if isinstance(spec, dict):
+            tag = next(iter(spec))
+            convert = _with_fallback(_structure_encoder(spec), _JSON[tag])
+        else:
+            tag = spec
+            convert = _CELL[tag]
+        columns.append((name, tag, convert))
+
+    def decode(item):
+        row = {}
+        found = 0
+        for name, tag, convert in columns:
+            value = item.get(name)
+            if value is None:
+                continue
+            found += 1
+            raw = value.get(tag, _MISSING)
+            if raw is _MISSING:
+                row[name] = decode_cell(value)
+            else:
+                row[name] = raw if convert is None else convert(raw)
+        if found != len(item):
+            for name, value in item.items():
+                if name not in row:
+                    row[name] = decode_cell(value)
+        return row
+    return decode
@@ -0,0 +1,259 @@
+import os
+import shutil
+from datetime import datetime
+from loguru import logger
+from common.checkpoint import ScanCheckpoint
+from common.deserializer import compile_row_decoder
+from common.metrics import current
+from common.projection import (compile_projection, log_projection_savings, merge_scan_kwargs, page_bytes,
+                               projection_kwargs, sample_item_size)
+from common.query import parallel_query, query_name
+from common.s3_stream import S3_BUCKET, S3MultipartSink, s3_client, s3_key
+from common.scan import parallel_scan
+from common.sinks import CsvSink, PartitionedCsvSink, SchemaUnionSink
+from common.tables import TABLES
+from common.watermark import (EXPORT_MODE, WatermarkTracker, load_state, save_state, use_incremental, watermark_filter,
+                              window_start)
+
+# "flat": un CSV por tabla; "partitioned": <tabla>/tenant_id=<t>/dt=<fecha>/part-000.csv
+OUTPUT_LAYOUT = os.getenv("OUTPUT_LAYOUT", "flat")
+# "local": CSV en output_dir para el load_*.py; "s3": se sube en streaming mientras se escanea
+OUTPUT_TARGET = os.getenv("OUTPUT_TARGET", "local")
+# "union": cabecera con todos los atributos vistos (volcado temporal a disco);
+# "first": cabecera del primer elemento, los atributos nuevos se descartan
+SCHEMA_MODE = os.getenv("SCHEMA_MODE", "union")
+
+
+def delta_file_name(table_name, timestamp):
+    return f"{table_name}.delta.{timestamp:%Y%m%dT%H%M%S}.csv"
+
+
+def query_file_name(table_name, query, timestamp):
+    return f"{table_name}.query.{query_name(query)}.{timestamp:%Y%m%dT%H%M%S}.csv"
+
+
+def partition_file_name(incremental, timestamp):
+    return f"delta-{timestamp:%Y%m%dT%H%M%S}.csv" if incremental else "part-000.csv"
+
+
+def _open_target(progress, delimiter, date_field, fieldnames, offset=None):
+    if progress["layout"] == "partitioned":
+        default_date = progress["started_at"][:10]
+        return PartitionedCsvSink(progress["output"], progress["part_name"], delimiter, date_field=date_field,
+                                  default_date=default_date, fieldnames=fieldnames, offsets=offset)
+    return CsvSink(progress["output"], delimiter, fieldnames=fieldnames, offset=offset)
+
+
+def _open_sink(progress, delimiter, date_field, resume=False):
+    offset = progress["offset"] if resume else None
+    if progress.get("spill"):
+        # El desplazamiento y las columnas del punto de control son los del volcado
+        return SchemaUnionSink(progress["spill"],
+                               lambda fieldnames: _open_target(progress, delimiter, date_field, fieldnames),
+                               fieldnames=progress["fieldnames"], offset=offset)
+    return _open_target(progress, delimiter, date_field, progress["fieldnames"], offset)
+
+
+def _written_bytes(sink):
+    # Bytes escritos por el destino (suma de archivos si está particionado)
+    position = sink.position()
+    return sum(position.values()) if isinstance(position, dict) else position
+
+
+def _required_columns(columns, config, layout, watermark_field):
+    # La partición y, en modo incremental, la marca de agua (con la clave, para descartar
+    # repetidos) necesitan sus atributos aunque no se hayan pedido; si no, la cabecera es la pedida
+    required = []
+    if layout == "partitioned":
+        required += ["tenant_id", config.get("partition_date")]
+    if watermark_field and EXPORT_MODE == "incremental":
+        required += config.get("key", []) + [watermark_field]
+    missing = [column for column in required if column and column not in columns]
+    if missing:
+        logger.info(f"Se añaden a la proyección las columnas necesarias: {missing}")
+    return columns + missing
+
+
+def export_table(dynamodb, table_name, output_dir, delimiter=";", total_segments=1, max_workers=None,
+                 rate_limiter=None, columns=None, s3=None, query=None):
+    # Exporta la tabla a CSV. Con EXPORT_MODE=incremental y un campo de marca de agua
+    # configurado, solo exporta lo modificado desde la última ejecución a un archivo delta.
+    # Si una ejecución anterior falló a mitad, se reanuda desde su punto de control.
+    # Con OUTPUT_LAYOUT=partitioned escribe particiones Hive por tenant_id y fecha.
+    # Con columns solo se leen esas columnas (ProjectionExpression) y forman la cabecera.
+    # Con SCHEMA_MODE=union (por defecto, salvo columns o S3) la cabecera es la unión de atributos.
+    # Con query (common/query.py) se usa Query por tenant en lugar de Scan y se escribe un
+    # CSV aparte <tabla>.query.<tenants>.<fecha>.csv que no toca la marca de agua.
+    # Con OUTPUT_TARGET=s3 el CSV se sube por partes a S3 sin pasar por disco (sin reanudación).
+    # Devuelve (salida, registros exportados); la salida es la ruta del CSV, el directorio de
+    # particiones o la URI s3://... del objeto subido.
+    config = TABLES.get(table_name, {})
+    decode = compile_row_decoder(config.get("schema"))
+    watermark_field = config.get("watermark")
+    watermark_state = load_state(table_name) if watermark_field else {}
+
+    streaming = OUTPUT_TARGET == "s3"
+    layout = OUTPUT_LAYOUT
+    if query and layout != "flat":
+        logger.warning("La exportación por Query escribe un único CSV; se ignora OUTPUT_LAYOUT.")
+        layout = "flat"
+    if streaming:
+        # El búfer en memoria se pierde si el proceso cae: no hay punto de control que reanudar
+        checkpoint = ScanCheckpoint(table_name, persist=False)
+        if layout != "flat":
+            logger.warning("OUTPUT_TARGET=s3 solo admite OUTPUT_LAYOUT=flat; se exporta un único CSV.")
+            layout = "flat"
+    else:
+        checkpoint = ScanCheckpoint.load(table_name)
+    partial_file = None
+    if checkpoint.resumable:
+        partial_file = checkpoint.state.get("spill") or (
+            checkpoint.state["output"] if checkpoint.state.get("layout") == "flat" else None)
+    if partial_file and checkpoint.state["offset"] and (
+            not os.path.exists(partial_file) or os.path.getsize(partial_file) < checkpoint.state["offset"]):
+        logger.warning(f"El archivo parcial '{partial_file}' no coincide con el punto de control; "
+                       "se exporta desde el inicio.")
+        checkpoint.clear()
+
+    if checkpoint.resumable:
+        progress = checkpoint.state
+        logger.info(f"Reanudando exportación de '{table_name}' desde el punto de control: "
+                    f"{progress['rows']} registros escritos en '{progress['output']}'.")
+        sink = _open_sink(progress, delimiter, config.get("partition_date"), resume=True)
+        sink.rows = progress["rows"]
+    else:
+        # Un subconjunto por tenant/fecha no es base para la exportación incremental
+        incremental = not query and bool(watermark_field) and use_incremental(watermark_state)
+        started_at = datetime.now()
+        scan_kwargs = {}
+        if incremental:
+            logger.info(f"Exportación incremental: '{watermark_field}' >= '{window_start(watermark_state['watermark'])}' "
+                        f"(marca '{watermark_state['watermark']}' menos el solape).")
+            scan_kwargs = watermark_filter(watermark_field, watermark_state["watermark"])
+        if columns:
+            columns = _required_columns(list(columns), config, layout, watermark_field)
+            scan_kwargs = merge_scan_kwargs(scan_kwargs, projection_kwargs(columns))
+
+        part_name = None
+        if layout == "partitioned":
+            output = os.path.join(output_dir, table_name)
+            part_name = partition_file_name(incremental, started_at)
+            # Una exportación completa reemplaza todas las particiones anteriores
+            if not incremental and os.path.isdir(output):
+                shutil.rmtree(output)
+        elif query:
+            output = os.path.join(output_dir, query_file_name(table_name, query, started_at))
+            total_segments = len(query["tenants"])
+        elif incremental:
+            output = os.path.join(output_dir, delta_file_name(table_name, started_at))
+        else:
+            output = os.path.join(output_dir, f"{table_name}.csv")
+        if streaming:
+            sink = S3MultipartSink(s3 or s3_client(), S3_BUCKET,
+                                   s3_key(table_name, os.path.basename(output),
+                                          "queries" if query else "deltas" if incremental else None),
+                                   delimiter, fieldnames=columns)
+            output = sink.path
+        checkpoint.start(output=output, layout=layout, part_name=part_name,
+                         total_segments=total_segments, scan_kwargs=scan_kwargs,
+                         incremental=incremental, started_at=started_at.isoformat(),
+                         watermark=watermark_state.get("watermark"), columns=columns, query=query,
+                         recent_keys={}, exported_keys=watermark_state.get("recent_keys", {}) if incremental else {},
+                         spill=f"{output}.spill" if SCHEMA_MODE == "union" and not columns and not streaming else None)
+        progress = checkpoint.state
+        progress["fieldnames"] = columns
+        if not streaming:
+            sink = _open_sink(progress, delimiter, config.get("partition_date"))
+
+    columns = progress.get("columns")
+    full_item_size = None
+    if columns:
+        decode = compile_projection(columns, decode)
+        full_item_size = sample_item_size(dynamodb, table_name)
+
+    if progress.get("query"):
+        response_iterator = parallel_query(dynamodb, table_name, progress["query"], max_workers=max_workers,
+                                           segments=checkpoint.pending_segments(),
+                                           start_keys=checkpoint.start_keys(), rate_limiter=rate_limiter,
+                                           **progress["scan_kwargs"])
+    else:
+        response_iterator = parallel_scan(dynamodb, table_name, total_segments=progress["total_segments"],
+                                          max_workers=max_workers, segments=checkpoint.pending_segments(),
+                                          start_keys=checkpoint.start_keys(), rate_limiter=rate_limiter,
+                                          **progress["scan_kwargs"])
+    tracker = None
+    if watermark_field and not progress.get("query"):
+        tracker = WatermarkTracker(watermark_field, config.get("key", []), progress["watermark"],
+                                   progress.get("recent_keys"), progress.get("exported_keys"))
+    skipped = 0
+    in_page = False
+    received_bytes = 0
+    metrics = current()
+    try:
+        for page_number, (segment, page) in enumerate(response_iterator, start=1):
+            in_page = True
+            received_bytes += page_bytes(page)
+            items = page.get("Items", [])
+            logger.info(f"Página {page_number} de '{table_name}' (segmento {segment}) contiene {len(items)} elementos.")
+            for item_number, item in enumerate(items, start=1):
+                try:
+                    row = decode(item)
+                except Exception as item_error:
+                    logger.warning(f"Error procesando elemento {item_number} en página {page_number}: {str(item_error)}")
+                    continue
+                if tracker is not None and not tracker.observe(row):
+                    # Releída por la ventana de solape y ya exportada sin cambios
+                    skipped += 1
+                    continue
+                sink.write(row)
+            if tracker is not None:
+                checkpoint.page_done(segment, page.get("LastEvaluatedKey"), sink, watermark=tracker.value,
+                                     recent_keys=tracker.recent)
+            else:
+                checkpoint.page_done(segment, page.get("LastEvaluatedKey"), sink)
+            in_page = False
+            metrics.add("pages")
+            metrics.add("items", len(items))
+            metrics.add("read_bytes", page_bytes(page))
+            metrics.add("consumed_rcu", page.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0))
+            metrics.add("retries", page.get("ResponseMetadata", {}).get("RetryAttempts", 0))
+            metrics.total("written_bytes", _written_bytes(sink))
+            if rate_limiter is not None:
+                metrics.total("throttles", rate_limiter.throttles)
+                metrics.set("read_rate_limit_rcu", rate_limiter.rate)
+    except BaseException:
+        # Se conserva el progreso hasta la última página completa para la próxima ejecución.
+        # Si el fallo ocurrió a mitad de una página vale el último punto de control guardado.
+        if streaming:
+            sink.abort()
+            logger.warning(f"Exportación de '{table_name}' interrumpida; subida a '{progress['output']}' descartada.")
+            raise
+        if not in_page:
+            checkpoint.save()
+        logger.warning(f"Exportación de '{table_name}' interrumpida; progreso guardado en '{checkpoint.path}'.")
+        raise
+    finally:
+        sink.close()
+    if progress.get("spill"):
+        sink.finish()
+        metrics.total("written_bytes", _written_bytes(sink.target))
+
+    if rate_limiter is not None:
+        logger.info(f"Capacidad de lectura de '{table_name}': {rate_limiter.summary()}.")
+    if columns:
+        log_projection_savings(table_name, columns, sink.rows, received_bytes, full_item_size)
+    if progress["layout"] == "partitioned":
+        logger.info(f"{sink.rows} registros repartidos en {sink.partitions} particiones bajo '{progress['output']}'.")
+
+    # La marca solo avanza cuando el archivo quedó escrito completo
+    if tracker is not None:
+        if skipped:
+            logger.info(f"{skipped} registros de la ventana de solape ya exportados se omitieron.")
+        watermark_state["watermark"] = tracker.value
+        watermark_state["recent_keys"] = tracker.prune()
+        if not progress["incremental"]:
+            watermark_state["last_full_export"] = progress["started_at"]
+        save_state(table_name, watermark_state)
+        logger.info(f"Marca de agua de '{table_name}' actualizada a '{tracker.value}'.")
+    checkpoint.clear()
+    return progress["output"], sink.rows
@@ -0,0 +1,240 @@
+import atexit
+import json
+import math
+import os
+import sys
+import threading
+import time
+from common.metrics import METRICS_DIRECTORY, METRICS_FORMAT
+
+# Latencia de cada llamada a AWS (Scan, PutItem, UploadPart...) por operación y tabla, medida
+# con los eventos de botocore del cliente: "call" va de la preparación de parámetros a la
+# respuesta final (reintentos y esperas incluidos) y "attempt" es cada envío HTTP por separado.
+# Al terminar el proceso se vuelcan p50/p95/p99 al log y a METRICS_DIRECTORY.
+LATENCY_HISTOGRAMS = os.getenv("LATENCY_HISTOGRAMS", "1") == "1"
+# Bits significativos que se conservan de cada valor (estilo HDR): con 8 cada potencia de dos
+# queda dividida en 128 sub-intervalos y el error relativo es < 1 %
+SUB_BUCKET_BITS = 8
+QUANTILES = (50, 95, 99)
+
+_CONTEXT_KEY = "ingesta_latency"
+
+
+class LatencyHistogram:
+    # Histograma log-lineal en microsegundos: el intervalo de un valor es su potencia de dos
+    # dividida en partes iguales (ver SUB_BUCKET_BITS), así la precisión relativa es la misma de
+    # 1 µs a minutos con unos pocos cientos de contadores (se guardan solo los usados).
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0
+
+    def record(self, seconds):
+        micros = max(1, int(seconds * 1_000_000))
+        shift = max(0, micros.bit_length() - SUB_BUCKET_BITS)
+        bucket = (shift, micros >> shift)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, micros)
+
+    def percentile(self, percent):
+        # Valor más alto equivalente del intervalo donde cae el percentil (en segundos)
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for shift, mantissa in sorted(self.counts):
+            seen += self.counts[(shift, mantissa)]
+            if seen >= target:
+                return min(((mantissa + 1) << shift) - 1, self.max) / 1_000_000
+        return self.max / 1_000_000
+
+
+_histograms = {}
+_retries = {}
+_errors = {}
+_lock = threading.Lock()
+_report = {"registered": False}
+
+
+def _label(params):
+    # Tabla (o prefijo S3 de la tabla) a la que apunta la llamada
+    if "TableName" in params:
+        return params["TableName"]
+    if "RequestItems" in params:
+        return ",".join(sorted(params["RequestItems"]))
+    if "StreamArn" in params:
+        # arn:aws:dynamodb:<región>:<cuenta>:table/<tabla>/stream/<fecha>
+        return params["StreamArn"].split("/")[1]
+    if "Bucket" in params:
+        key = params.get("Key") or params.get("Prefix") or ""
+        return key.split("/")[0] if "/" in key else params["Bucket"]
+    return "-"
+
+
+def _record(kind, operation, table, seconds):
+    with _lock:
+        histogram = _histograms.get((kind, operation, table))
+        if histogram is None:
+            histogram = _histograms[(kind, operation, table)] = LatencyHistogram()
+        histogram.record(seconds)
+
+
+def _count(counter, operation, table, value=1):
+    with _lock:
+        counter[(operation, table)] = counter.get((operation, table), 0) + value
+
+
+def _on_parameters(params, model, context, **kwargs):
+    # Primer evento de la llamada: guarda en su contexto la etiqueta y el inicio
+    context[_CONTEXT_KEY] = {"operation": model.name, "table": _label(params), "start": time.perf_counter(),
+                             "attempts": 0}
+
+
+def _on_send(request, **kwargs):
+    state = (request.context or {}).get(_CONTEXT_KEY)
+    if state is not None:
+        state["attempts"] += 1
+        state["attempt_start"] = time.perf_counter()
+
+
+def _on_response(context, **kwargs):
+    state = context.get(_CONTEXT_KEY)
+    if state is not None and "attempt_start" in state:
+        _record("attempt", state["operation"], state["table"], time.perf_counter() - state.pop("attempt_start"))
+
+
+def _finish(context, failed):
+    state = context.pop(_CONTEXT_KEY, None)
+    if state is None:
+        return
+    _record("call", state["operation"], state["table"], time.perf_counter() - state["start"])
+    if state["attempts"] > 1:
+        _count(_retries, state["operation"], state["table"], state["attempts"] - 1)
+    if failed:
+        _count(_errors, state["operation"], state["table"])
+
+
+def _on_call(http_response, context, **kwargs):
+    _finish(context, http_response.status_code >= 300)
+
+
+def _on_call_error(context, **kwargs):
+    _finish(context, True)
+
+
+def instrument(client):
+    # Engancha el cliente (o resource.meta.client) a los histogramas; repetirlo no duplica
+    if not LATENCY_HISTOGRAMS:
+        return client
+    events = client.meta.events
+    events.register("before-parameter-build", _on_parameters, unique_id="ingesta-latency-parameters")
+    events.register("before-send", _on_send, unique_id="ingesta-latency-send")
+    events.register("response-received", _on_response, unique_id="ingesta-latency-response")
+    events.register("after-call", _on_call, unique_id="ingesta-latency-call")
+    events.register("after-call-error", _on_call_error, unique_id="ingesta-latency-call-error")
+    return client
+
+
+def snapshot():
+    # [{kind, operation, table, count, errors, retries, mean, max, p50, p95, p99}] por tiempo total
+    with _lock:
+        rows = []
+        for (kind, operation, table), histogram in _histograms.items():
+            row = {"kind": kind, "operation": operation, "table": table, "count": histogram.count,
+                   "total": histogram.total, "mean": histogram.total / histogram.count,
+                   "max": histogram.max / 1_000_000}
+            if kind == "call":
+                row["errors"] = _errors.get((operation, table), 0)
+                row["retries"] = _retries.get((operation, table), 0)
+            for quantile in QUANTILES:
+                row[f"p{quantile}"] = histogram.percentile(quantile)
+            rows.append(row)
+    return sorted(rows, key=lambda row: (row["kind"] != "call", -row["total"]))
+
+
+def summary_lines(rows=None):
+    rows = snapshot() if rows is None else rows
+    lines = [f"{'operación':<24} {'tabla':<20} {'llamadas':>9} {'reintentos':>10} {'errores':>8} "
+             f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}"]
+    for row in rows:
+        if row["kind"] != "call":
+            continue
+        lines.append(f"{row['operation']:<24} {row['table']:<20} {row['count']:>9} {row['retries']:>10} "
+                     f"{row['errors']:>8} {row['p50'] * 1000:>8.1f} {row['p95'] * 1000:>8.1f} "
+                     f"{row['p99'] * 1000:>8.1f} {row['max'] * 1000:>8.1f}")
+    return lines
+
+
+def prometheus_text(rows, name):
+    families = {}
+
+    def metric(family, kind, labels, value):
+        text = ",".join(f'{label}="{label_value}"' for label, label_value in dict(labels, script=name).items())
+        families.setdefault(family, (kind, []))[1].append(f"{family}{{{text}}} {float(value)!r}")
+
+    for row in rows:
+        labels = {"operation": row["operation"], "table": row["table"]}
+        family = f"ingesta_aws_{row['kind']}_seconds"
+        for quantile in QUANTILES:
+            metric(family, "summary", dict(labels, quantile=str(quantile / 100)), row[f"p{quantile}"])
+        metric(f"{family}_sum", None, labels, row["total"])
+        metric(f"{family}_count", None, labels, row["count"])
+        metric(f"ingesta_aws_{row['kind']}_max_seconds", "gauge", labels, row["max"])
+        if row["kind"] == "call":
+            metric("ingesta_aws_retries_total", "counter", labels, row["retries"])
+            metric("ingesta_aws_errors_total", "counter", labels, row["errors"])
+    lines = []
+    for family, (kind, samples) in families.items():
+        # _sum y _count pertenecen a la familia summary y no llevan TYPE propio
+        if kind is not None:
+            lines.append(f"# TYPE {family} {kind}")
+        lines += samples
+    return "\n".join(lines) + "\n"
+
+
+def write_report(name):
+    # Escribe los histogramas acumulados en METRICS_DIRECTORY/ingesta_latency_<name>.<prom|jsonl>
+    rows = snapshot()
+    if METRICS_FORMAT == "none" or not rows:
+        return None
+    os.makedirs(METRICS_DIRECTORY, exist_ok=True)
+    if METRICS_FORMAT == "jsonl":
+        path = os.path.join(METRICS_DIRECTORY, f"ingesta_latency_{name}.jsonl")
+        with open(path, "a", encoding="utf-8") as report_file:
+            report_file.write(json.dumps({"timestamp": round(time.time(), 3), "script": name, "calls": rows}) + "\n")
+        return path
+    path = os.path.join(METRICS_DIRECTORY, f"ingesta_latency_{name}.prom")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as report_file:
+        report_file.write(prometheus_text(rows, name))
+    os.replace(tmp_path, path)
+    return path
+
+
+def script_name():
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+
+def report_at_exit(log=print):
+    # Al salir del proceso: tabla de percentiles en el log y archivo de métricas (una vez)
+    with _lock:
+        if _report["registered"]:
+            return
+        _report["registered"] = True
+
+    def report():
+        rows = snapshot()
+        if not rows:
+            return
+        for line in ["Latencia de llamadas a AWS:"] + summary_lines(rows):
+            log(line)
+        try:
+            write_report(script_name())
+        except OSError as e:
+            log(f"No se pudo escribir el reporte de latencia: {str(e)}")
+
+    atexit.register(report)
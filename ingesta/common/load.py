@@ -0,0 +1,155 @@
+import glob
+import os
+from botocore.exceptions import ClientError, NoCredentialsError
+from loguru import logger
+from datetime import datetime
+from common.logs import setup_logging
+from common.manifest import UploadManifest
+from common.metrics import stage_metrics
+from common.s3_stream import S3_BUCKET, s3_client, s3_key
+from common.tables import TABLES
+from common.transfer import upload_file
+
+# Carga a S3 compartida por los t_*/load_*.py: cada script solo indica su tabla y su archivo de log
+BASE_DIRECTORY = "./exported_data"
+# Bucket de destino (S3_BUCKET), el mismo que usan load_all.py y la exportación a S3
+BUCKET_NAME = S3_BUCKET
+
+
+def find_output_files(base_directory, table_name):
+    # Archivos a subir además del CSV plano: deltas de la exportación incremental, cambios
+    # leídos del stream (CDC), exportaciones por Query y particiones Hive (<tabla>/tenant_id=<t>/dt=<fecha>/...).
+    # Devuelve tuplas (ruta local, clave S3, es_delta). Las particiones van bajo el prefijo de la
+    # tabla y el resto bajo deltas/, cdc/ o queries/ (ver s3_key), también los deltas particionados.
+    files = []
+    for delta_path in sorted(glob.glob(os.path.join(base_directory, f"{table_name}.delta.*.csv"))):
+        files.append((delta_path, s3_key(table_name, os.path.basename(delta_path), "deltas"), True))
+    for cdc_path in sorted(glob.glob(os.path.join(base_directory, f"{table_name}.cdc.*.csv"))):
+        files.append((cdc_path, s3_key(table_name, os.path.basename(cdc_path), "cdc"), True))
+    for query_path in sorted(glob.glob(os.path.join(base_directory, f"{table_name}.query.*.csv"))):
+        files.append((query_path, s3_key(table_name, os.path.basename(query_path), "queries"), True))
+
+    partition_root = os.path.join(base_directory, table_name)
+    for root, _, names in sorted(os.walk(partition_root)):
+        for name in sorted(names):
+            local_path = os.path.join(root, name)
+            relative_key = os.path.relpath(local_path, partition_root).replace(os.sep, "/")
+            is_delta = name.startswith("delta-")
+            files.append((local_path, s3_key(table_name, relative_key, "deltas" if is_delta else None), is_delta))
+    return files
+
+
+def check_bucket_exists(bucket_name):
+    try:
+        s3_client().head_bucket(Bucket=bucket_name)
+        logger.info(f"El bucket '{bucket_name}' existe y está accesible.")
+        return True
+    except ClientError as e:
+        logger.error(f"Error al acceder al bucket '{bucket_name}': {str(e)}")
+        return False
+
+
+def upload_to_s3(file_path, bucket, s3_file_path):
+    try:
+        upload_file(s3_client(), file_path, bucket, s3_file_path)
+        logger.info(f"Archivo '{file_path}' subido exitosamente a '{s3_file_path}' en el bucket '{bucket}'.")
+        return True
+    except FileNotFoundError:
+        logger.error(f"El archivo '{file_path}' no fue encontrado.")
+        return False
+    except NoCredentialsError:
+        logger.critical("Credenciales de AWS no disponibles.")
+        return False
+    except ClientError as e:
+        logger.error(f"Error de cliente al subir el archivo '{file_path}': {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Error desconocido al subir el archivo '{file_path}': {str(e)}")
+        return False
+
+
+def ingest(table_name, prefix=None):
+    # Sube el CSV plano, particiones y deltas de la tabla bajo su prefijo (por defecto el
+    # "s3_prefix" de common/tables.py). True si no falló ninguna subida o no había nada que subir.
+    prefix = prefix or TABLES.get(table_name, {}).get("s3_prefix", table_name)
+    logger.info(f"Iniciando ingesta de '{table_name}' al bucket '{BUCKET_NAME}'.")
+    if not check_bucket_exists(BUCKET_NAME):
+        logger.critical(f"El bucket '{BUCKET_NAME}' no está disponible. Abortando ingesta.")
+        return False
+
+    start_time = datetime.now()
+    processed_files = 0
+    skipped_files = 0
+    failed_files = 0
+
+    if not os.path.exists(BASE_DIRECTORY):
+        # Sin salida de la extracción la etapa falla (código 1) y el pipeline la reintenta
+        logger.error(f"El directorio '{BASE_DIRECTORY}' no existe. Abortando ingesta.")
+        return False
+
+    file_name = f"{table_name}.csv"
+    file_path = os.path.join(BASE_DIRECTORY, file_name)
+    output_files = find_output_files(BASE_DIRECTORY, table_name)
+    if not os.path.isfile(file_path) and not output_files:
+        logger.warning(f"No se encontró el archivo '{file_name}' en '{BASE_DIRECTORY}'. Nada para subir.")
+        return True
+
+    # Hashes de lo ya subido: solo se suben los archivos cuyo contenido cambió
+    manifest = UploadManifest.load(s3_client(), BUCKET_NAME, prefix, table_name)
+
+    if os.path.isfile(file_path):
+        file_size = os.path.getsize(file_path) / 1024  # Tamaño en KB
+        logger.info(f"Archivo '{file_path}' encontrado. Tamaño: {file_size:.2f} KB.")
+
+        s3_file_path = f"{prefix}/{file_name}"
+        if not manifest.changed(file_path, s3_file_path):
+            logger.info(f"Archivo '{file_path}' sin cambios desde la última subida; se omite.")
+            skipped_files += 1
+        else:
+            try:
+                logger.info(f"Subiendo archivo '{file_path}' al bucket S3 en la ruta '{s3_file_path}'.")
+                upload_start_time = datetime.now()
+                if upload_to_s3(file_path, BUCKET_NAME, s3_file_path):
+                    manifest.uploaded(s3_file_path)
+                    upload_end_time = datetime.now()
+                    upload_duration = upload_end_time - upload_start_time
+                    logger.info(f"Archivo '{file_path}' subido exitosamente en {upload_duration.seconds} segundos.")
+                    processed_files += 1
+                else:
+                    failed_files += 1
+            except Exception as e:
+                logger.error(f"Error durante el procesamiento del archivo '{file_path}': {str(e)}")
+                failed_files += 1
+
+    # Subir particiones (tenant_id=<t>/dt=<fecha>/...) bajo el prefijo de la tabla y deltas
+    # bajo deltas/<prefijo>/ (fuera de la tabla); los deltas se retiran del disco una vez subidos
+    # y las particiones sin cambios (mismo hash que en el manifiesto) no se vuelven a subir
+    for local_path, key, is_delta in output_files:
+        if not is_delta and not manifest.changed(local_path, key):
+            skipped_files += 1
+            continue
+        if upload_to_s3(local_path, BUCKET_NAME, key):
+            processed_files += 1
+            if is_delta:
+                os.remove(local_path)
+            else:
+                manifest.uploaded(key)
+        else:
+            failed_files += 1
+    manifest.save()
+
+    end_time = datetime.now()
+    summary = f"Tiempo total: {end_time - start_time}. Archivos procesados: {processed_files}, sin cambios: {skipped_files}"
+    if failed_files:
+        # Código de salida 1: el pipeline reintenta la etapa
+        logger.error(f"Ingesta incompleta: {failed_files} archivos no se pudieron subir. {summary}")
+    else:
+        logger.success(f"Ingesta completada. {summary}")
+    return failed_files == 0
+
+
+def load_table(table_name, log_file_path, prefix=None):
+    # Cuerpo del main() de cada t_*/load_*.py; True si la carga terminó bien
+    setup_logging(log_file_path)
+    with stage_metrics("load", table_name) as metrics:
+        return metrics.done(ingest(table_name, prefix))
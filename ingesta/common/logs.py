@@ -0,0 +1,20 @@
+from loguru import logger
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {message}"
+_sinks = set()
+
+
+def setup_logging(log_file_path):
+    # Agrega el archivo de log del script (una sola vez por proceso). Si varias tareas corren
+    # en el mismo proceso (pipeline en modo hilo) cada una se marca con logger.contextualize(
+    # log_file=...) y su archivo recibe solo sus mensajes y los que no llevan marca.
+    if log_file_path in _sinks:
+        return
+    _sinks.add(log_file_path)
+    logger.add(
+        log_file_path,
+        format=LOG_FORMAT,
+        level="INFO",
+        rotation="10 MB",
+        filter=lambda record: record["extra"].get("log_file", log_file_path) == log_file_path
+    )
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from botocore.exceptions import ClientError
+from loguru import logger
+from common.compression import active_codec
+from common.watermark import STATE_DIRECTORY
+
+# Manifiesto de lo subido a S3 por tabla: clave -> hash SHA-256 y tamaño del archivo.
+# Se guarda en state/<tabla>.manifest.json y en <prefijo>/_manifest.json (Athena/Hive
+# ignoran los archivos que empiezan por "_"); el de S3 permite arrancar sin estado local.
+HASH_CHUNK_BYTES = 1024 * 1024
+# LOAD_FORCE=1 sube todo aunque el hash no haya cambiado
+LOAD_FORCE = os.getenv("LOAD_FORCE", "0") == "1"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadManifest:
+
+    def __init__(self, s3, bucket, prefix, table_name, entries=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.table_name = table_name
+        self.path = os.path.join(STATE_DIRECTORY, f"{table_name}.manifest.json")
+        self.key = f"{prefix}/_manifest.json"
+        self.entries = entries or {}
+        self._pending = {}
+
+    @classmethod
+    def load(cls, s3, bucket, prefix, table_name):
+        manifest = cls(s3, bucket, prefix, table_name)
+        if os.path.exists(manifest.path):
+            with open(manifest.path, encoding="utf-8") as manifest_file:
+                manifest.entries = json.load(manifest_file)
+            return manifest
+        try:
+            body = s3.get_object(Bucket=bucket, Key=manifest.key)["Body"].read()
+            manifest.entries = json.loads(body)
+            logger.info(f"Manifiesto de '{table_name}' recuperado de 's3://{bucket}/{manifest.key}'.")
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                raise
+        return manifest
+
+    def changed(self, local_path, key):
+        # True si el contenido (o la compresión con que se sube) difiere de lo último subido a esa clave
+        digest = file_hash(local_path)
+        codec = active_codec()
+        self._pending[key] = {"sha256": digest, "size": os.path.getsize(local_path), "codec": codec}
+        entry = self.entries.get(key)
+        return LOAD_FORCE or entry is None or entry["sha256"] != digest or entry.get("codec") != codec
+
+    def uploaded(self, key):
+        entry = self._pending.pop(key)
+        entry["uploaded_at"] = datetime.now().isoformat(timespec="seconds")
+        self.entries[key] = entry
+
+    def save(self):
+        # Se escribe una sola vez al final: primero el local (reemplazo atómico) y luego
+        # el de S3 (un PUT reemplaza el objeto completo)
+        os.makedirs(STATE_DIRECTORY, exist_ok=True)
+        body = json.dumps(self.entries, indent=2, sort_keys=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(body)
+        os.replace(tmp_path, self.path)
+        self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=body.encode("utf-8"),
+                           ContentType="application/json")
+        logger.info(f"Manifiesto de '{self.table_name}' actualizado: {len(self.entries)} archivos.")
@@ -0,0 +1,235 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from loguru import logger
+
+# Métricas de cada etapa (pull o load de una tabla) para encontrar el cuello de botella:
+# páginas, elementos, bytes leídos y escritos, RCU, limitaciones, MB/s de subida y la
+# ocupación de las colas internas. Se escriben cada METRICS_INTERVAL_SECONDS y al terminar en
+# METRICS_DIRECTORY/ingesta_<etapa>_<tabla>.prom (formato textfile de Prometheus, para el
+# colector de node_exporter) o .jsonl (una línea JSON por instantánea).
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "prometheus").lower()
+METRICS_DIRECTORY = os.getenv("METRICS_DIRECTORY", "./metrics")
+METRICS_INTERVAL_SECONDS = float(os.getenv("METRICS_INTERVAL_SECONDS", "10"))
+# Cada cuánto se muestrea la ocupación de las colas entre escrituras
+QUEUE_SAMPLE_SECONDS = 1.0
+
+MB = 1024 * 1024
+
+# Contadores cuyo ritmo por segundo (media de la etapa) se publica también
+RATES = {"pages": "pages_per_second", "items": "items_per_second", "read_bytes": "read_bytes_per_second",
+         "written_bytes": "written_bytes_per_second", "consumed_rcu": "consumed_rcu_per_second"}
+
+# Etapa activa en el contexto actual (cada hilo del pipeline o de export_all tiene la suya)
+_current = contextvars.ContextVar("ingesta_metrics", default=None)
+
+
+class StageMetrics:
+    # Contadores (add/total), valores instantáneos (set) y colas observadas (watch), seguros
+    # entre hilos. Un hilo en segundo plano muestrea las colas y escribe las instantáneas.
+
+    def __init__(self, stage, table):
+        self.stage = stage
+        self.table = table
+        self.status = "running"
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self._queues = {}
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        extension = "jsonl" if METRICS_FORMAT == "jsonl" else "prom"
+        self.path = os.path.join(METRICS_DIRECTORY, f"ingesta_{stage}_{table}.{extension}")
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def total(self, name, value):
+        # Contador que ya lleva su propio acumulado (p. ej. las limitaciones del limitador)
+        with self._lock:
+            self.counters[name] = value
+
+    def set(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def watch(self, name, depth, capacity=None):
+        # depth() devuelve la ocupación actual de la cola; se muestrea en segundo plano
+        with self._lock:
+            self._queues[name] = {"depth": depth, "capacity": capacity, "sum": 0.0, "samples": 0, "max": 0}
+
+    def unwatch(self, name):
+        with self._lock:
+            queue = self._queues.get(name)
+            if queue is not None:
+                # Se conservan las estadísticas; la cola ya no existe
+                queue["depth"] = None
+
+    def done(self, ok):
+        self.status = "ok" if ok else "failed"
+        return ok
+
+    def _sample_queues(self):
+        with self._lock:
+            queues = list(self._queues.values())
+        for queue in queues:
+            depth = queue["depth"]
+            if depth is None:
+                continue
+            try:
+                value = depth()
+            except Exception:
+                continue
+            with self._lock:
+                queue["last"] = value
+                queue["sum"] += value
+                queue["samples"] += 1
+                queue["max"] = max(queue["max"], value)
+
+    def snapshot(self):
+        elapsed = max(time.perf_counter() - self._start, 1e-6)
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            queues = {name: {"depth": queue.get("last", 0) if queue["depth"] is not None else 0,
+                             "avg": queue["sum"] / queue["samples"] if queue["samples"] else 0.0,
+                             "max": queue["max"], "capacity": queue["capacity"]}
+                      for name, queue in self._queues.items()}
+        rates = {rate: counters[name] / elapsed for name, rate in RATES.items() if name in counters}
+        # MB/s de subida sobre el tiempo que se estuvo subiendo, no sobre toda la etapa
+        if counters.get("uploaded_bytes") and counters.get("upload_seconds"):
+            rates["upload_mb_per_second"] = counters["uploaded_bytes"] / MB / counters["upload_seconds"]
+        return {"timestamp": round(time.time(), 3), "stage": self.stage, "table": self.table,
+                "status": self.status, "started_at": round(self._started_at, 3), "elapsed_seconds": round(elapsed, 3),
+                "counters": counters, "rates": rates, "gauges": gauges, "queues": queues}
+
+    def write(self):
+        snapshot = self.snapshot()
+        os.makedirs(METRICS_DIRECTORY, exist_ok=True)
+        if METRICS_FORMAT == "jsonl":
+            with open(self.path, "a", encoding="utf-8") as metrics_file:
+                metrics_file.write(json.dumps(snapshot) + "\n")
+            return
+        # El colector lee el archivo en cualquier momento: se reemplaza de forma atómica
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(prometheus_text(snapshot))
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"metrics-{self.stage}-{self.table}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_write = time.monotonic() + METRICS_INTERVAL_SECONDS
+        while not self._stop.wait(QUEUE_SAMPLE_SECONDS):
+            self._sample_queues()
+            if time.monotonic() >= next_write:
+                next_write += METRICS_INTERVAL_SECONDS
+                self._safe_write()
+
+    def _safe_write(self):
+        # Las métricas nunca detienen la ingesta
+        try:
+            self.write()
+        except Exception as e:
+            logger.warning(f"No se pudieron escribir las métricas en '{self.path}': {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample_queues()
+        self._safe_write()
+
+
+class _NullMetrics:
+    # Sustituto sin efecto cuando no hay etapa activa o METRICS_FORMAT=none
+
+    def add(self, name, value=1):
+        pass
+
+    def total(self, name, value):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def watch(self, name, depth, capacity=None):
+        pass
+
+    def unwatch(self, name):
+        pass
+
+    def done(self, ok):
+        return ok
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def current():
+    return _current.get() or NULL_METRICS
+
+
+@contextmanager
+def stage_metrics(stage, table):
+    # with stage_metrics("pull", "pf_ordenes") as metrics: ... return metrics.done(ok)
+    if METRICS_FORMAT == "none":
+        yield NULL_METRICS
+        return
+    metrics = StageMetrics(stage, table)
+    token = _current.set(metrics)
+    metrics.start()
+    try:
+        yield metrics
+    except BaseException:
+        metrics.status = "failed"
+        raise
+    finally:
+        _current.reset(token)
+        metrics.stop()
+
+
+def _labels(snapshot, **extra):
+    labels = {"stage": snapshot["stage"], "table": snapshot["table"], **extra}
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def prometheus_text(snapshot):
+    # Cada familia lleva su línea TYPE seguida de todas sus muestras
+    families = {}
+
+    def metric(name, kind, value, **extra):
+        families.setdefault(f"ingesta_{name}", (kind, []))[1].append(
+            f"ingesta_{name}{_labels(snapshot, **extra)} {float(value)!r}")
+
+    for name, value in sorted(snapshot["counters"].items()):
+        metric(f"{name}_total", "counter", value)
+    for name, value in sorted(snapshot["rates"].items()):
+        metric(name, "gauge", value)
+    for name, value in sorted(snapshot["gauges"].items()):
+        metric(name, "gauge", value)
+    for queue, stats in sorted(snapshot["queues"].items()):
+        metric("queue_depth", "gauge", stats["depth"], queue=queue)
+        metric("queue_depth_avg", "gauge", stats["avg"], queue=queue)
+        metric("queue_depth_max", "gauge", stats["max"], queue=queue)
+        if stats["capacity"]:
+            metric("queue_capacity", "gauge", stats["capacity"], queue=queue)
+    metric("stage_elapsed_seconds", "gauge", snapshot["elapsed_seconds"])
+    metric("stage_started_timestamp_seconds", "gauge", snapshot["started_at"])
+    metric("stage_running", "gauge", snapshot["status"] == "running")
+    metric("stage_success", "gauge", snapshot["status"] == "ok")
+    metric("last_update_timestamp_seconds", "gauge", snapshot["timestamp"])
+    lines = []
+    for name, (kind, samples) in families.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines += samples
+    return "\n".join(lines) + "\n"
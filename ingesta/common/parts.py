@@ -0,0 +1,92 @@
+import base64
+import hashlib
+import mmap
+import os
+import zlib
+
+# Lectura de partes para subidas multipart sin copias: el archivo se mapea en memoria una
+# sola vez y cada parte es un memoryview sobre el mapa. Las páginas las trae el kernel
+# bajo demanda y se pueden descartar cuando hace falta, así la memoria residente no crece
+# con el tamaño de parte ni con la concurrencia como al leer cada parte a un bytes.
+CHECKSUM_ALGORITHM = "CRC32"
+# Content-MD5 además del CRC32: S3 ya valida el CRC32, el MD5 solo hace falta en
+# endpoints compatibles que no soportan x-amz-checksum-* (cuesta otra pasada de CPU)
+UPLOAD_CONTENT_MD5 = os.getenv("UPLOAD_CONTENT_MD5", "0") == "1"
+# Tamaño de los trozos con que se calculan las sumas (hashlib y zlib liberan el GIL)
+CHECKSUM_CHUNK_BYTES = 1024 * 1024
+
+
+class PartBody:
+    # Objeto tipo archivo sobre un memoryview: botocore lo envía por trozos con read(n)
+    # y vuelve al inicio con seek() si reintenta. read() sin límite (una lectura completa,
+    # p. ej. un mock) devuelve bytes; con límite devuelve vistas sin copiar.
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def read(self, size=-1):
+        start = self._position
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), start + size)
+        self._position = end
+        if size is None or size < 0:
+            return self._view[start:end].tobytes()
+        return self._view[start:end]
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += len(self._view)
+        self._position = max(0, min(len(self._view), offset))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+def checksums(view):
+    # CRC32 (x-amz-checksum-crc32) y, si se pide, MD5 (Content-MD5) en una sola pasada sobre la vista
+    md5 = hashlib.md5() if UPLOAD_CONTENT_MD5 else None
+    crc = 0
+    for offset in range(0, len(view), CHECKSUM_CHUNK_BYTES):
+        chunk = view[offset:offset + CHECKSUM_CHUNK_BYTES]
+        if md5 is not None:
+            md5.update(chunk)
+        crc = zlib.crc32(chunk, crc)
+        chunk.release()
+    content_md5 = base64.b64encode(md5.digest()).decode("ascii") if md5 is not None else None
+    return content_md5, base64.b64encode(crc.to_bytes(4, "big")).decode("ascii")
+
+
+class MappedFile:
+    # with MappedFile(ruta) as mapped: mapped.part(número, tamaño_de_parte) -> memoryview
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Las partes se leen de principio a fin: el kernel puede leer por adelantado
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._view = memoryview(self._map)
+        return self
+
+    def part(self, part_number, part_size):
+        start = (part_number - 1) * part_size
+        return self._view[start:start + part_size]
+
+    def __exit__(self, *exc_info):
+        # Las vistas de cada parte deben estar liberadas antes de cerrar el mapa
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Alguna vista sigue viva (p. ej. en la traza de un error): el mapa se libera con ella
+            pass
+        self._file.close()
@@ -0,0 +1,102 @@
+import argparse
+import os
+from loguru import logger
+from common.deserializer import decode_cell
+from common.tables import TABLES
+
+# Elementos leídos sin proyección para estimar los bytes ahorrados (0 desactiva la muestra)
+PROJECTION_SAMPLE_ITEMS = int(os.getenv("PROJECTION_SAMPLE_ITEMS", "100"))
+
+
+def parse_columns(value):
+    return [column.strip() for column in value.split(",") if column.strip()] if value else None
+
+
+def resolve_columns(table_name, argv=None):
+    # Columnas a exportar: --columns a,b,c > variable EXPORT_COLUMNS > "columns" de la tabla
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--columns")
+    args, _ = parser.parse_known_args(argv or [])
+    return (parse_columns(args.columns)
+            or parse_columns(os.getenv("EXPORT_COLUMNS"))
+            or TABLES.get(table_name, {}).get("columns"))
+
+
+def unknown_columns(table_name, columns):
+    # Columnas (o el atributo raíz de una ruta anidada) que no están en el esquema de la tabla
+    schema = TABLES.get(table_name, {}).get("schema", {})
+    return [column for column in columns or [] if column.split(".")[0] not in schema]
+
+
+def projection_kwargs(columns):
+    # ProjectionExpression con nombres sustituidos (#c0, #c1...) para evitar palabras reservadas;
+    # admite rutas anidadas como product_info.category
+    names = {}
+    paths = []
+    for column in columns:
+        parts = []
+        for part in column.split("."):
+            placeholder = next((key for key, name in names.items() if name == part), None)
+            if placeholder is None:
+                placeholder = f"#c{len(names)}"
+                names[placeholder] = part
+            parts.append(placeholder)
+        paths.append(".".join(parts))
+    return {"ProjectionExpression": ", ".join(paths), "ExpressionAttributeNames": names}
+
+
+def merge_scan_kwargs(*kwargs_list):
+    # Combina parámetros de Scan uniendo los ExpressionAttributeNames/Values
+    merged = {}
+    for kwargs in kwargs_list:
+        for key, value in kwargs.items():
+            if key in ("ExpressionAttributeNames", "ExpressionAttributeValues"):
+                merged.setdefault(key, {}).update(value)
+            else:
+                merged[key] = value
+    return merged
+
+
+def compile_projection(columns, decode):
+    # Fila con exactamente las columnas pedidas; las rutas anidadas se extraen del elemento crudo
+    nested = [(column, column.split(".")) for column in columns if "." in column]
+    if not nested:
+        return decode
+    # Atributos padre traídos solo para las rutas anidadas (no se piden como columna)
+    parents = {path[0] for _, path in nested} - set(columns)
+
+    def project(item):
+        row = decode(item)
+        for column, path in nested:
+            value = item.get(path[0])
+            for part in path[1:]:
+                value = value.get("M", {}).get(part) if value else None
+            row[column] = decode_cell(value) if value else None
+        for parent in parents:
+            row.pop(parent, None)
+        return row
+    return project
+
+
+def page_bytes(page):
+    return int(page.get("ResponseMetadata", {}).get("HTTPHeaders", {}).get("content-length", 0))
+
+
+def sample_item_size(dynamodb, table_name):
+    # Bytes medios por elemento sin proyección, a partir de una página pequeña
+    if PROJECTION_SAMPLE_ITEMS <= 0:
+        return None
+    page = dynamodb.scan(TableName=table_name, Limit=PROJECTION_SAMPLE_ITEMS)
+    items = len(page.get("Items", []))
+    if not items or not page_bytes(page):
+        return None
+    return page_bytes(page) / items
+
+
+def log_projection_savings(table_name, columns, items, received_bytes, full_item_size):
+    logger.info(f"Proyección de '{table_name}': {len(columns)} columnas, {received_bytes / 1024:.1f} KB recibidos.")
+    if full_item_size and items:
+        estimated_full = full_item_size * items
+        saved = max(0.0, estimated_full - received_bytes)
+        logger.info(f"Sin proyección se habrían recibido ~{estimated_full / 1024:.1f} KB: "
+                    f"ahorro estimado de {saved / 1024:.1f} KB ({saved / estimated_full:.0%}).")
@@ -0,0 +1,90 @@
+import os
+import sys
+from datetime import datetime
+from loguru import logger
+from common.clients import aws_client
+from common.export import export_table
+from common.logs import setup_logging
+from common.metrics import stage_metrics
+from common.projection import resolve_columns
+from common.query import resolve_query
+from common.streams import export_changes
+from common.tables import TABLES
+from common.throttle import create_rate_limiter
+from common.watermark import EXPORT_MODE
+
+# Extracción de una tabla de DynamoDB a CSV, compartida por los t_*/pull_*.py: cada script
+# solo indica su tabla y su archivo de log; delimitador, segmentos y stream salen de common/tables.py.
+REGION = "us-east-1"
+OUTPUT_DIR = "./exported_data"
+
+# Configuración del escaneo paralelo (Segment/TotalSegments): sin SCAN_SEGMENTS se usan los
+# "segments" de la tabla (1 si no define) y sin SCAN_WORKERS un hilo por segmento
+SCAN_SEGMENTS = os.getenv("SCAN_SEGMENTS")
+SCAN_WORKERS = os.getenv("SCAN_WORKERS")
+
+
+def scan_segments(table_name):
+    return int(SCAN_SEGMENTS) if SCAN_SEGMENTS else TABLES.get(table_name, {}).get("segments", 1)
+
+
+def scan_workers(table_name):
+    return int(SCAN_WORKERS) if SCAN_WORKERS else scan_segments(table_name)
+
+
+def export_table_to_csv_dynamodb(table_name, output_dir=OUTPUT_DIR, argv=None):
+    logger.info(f"Iniciando exportación de datos de la tabla '{table_name}' a CSV en '{output_dir}'.")
+    start_time = datetime.now()
+    config = TABLES.get(table_name, {})
+    delimiter = config.get("delimiter", ";")
+
+    try:
+        workers = scan_workers(table_name)
+        dynamodb = aws_client("dynamodb", max(10, workers), region_name=REGION)
+
+        # Crear directorio de salida si no existe
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            logger.info(f"Directorio de salida creado: {output_dir}")
+        else:
+            logger.info(f"Directorio de salida ya existe: {output_dir}")
+
+        # Limitar la lectura a un porcentaje de la capacidad de la tabla (AIMD)
+        rate_limiter = create_rate_limiter(dynamodb, table_name)
+
+        # Columnas a exportar (--columns, EXPORT_COLUMNS o configuración de la tabla)
+        columns = resolve_columns(table_name, argv)
+
+        # Query por tenant / rango de fechas (--tenants, --since, --until, --last-days) en lugar de Scan
+        query = resolve_query(table_name, argv)
+
+        if EXPORT_MODE == "cdc" and config.get("stream"):
+            # Solo los cambios desde la última ejecución, leídos del stream de la tabla
+            logger.info("Leyendo cambios del stream de la tabla DynamoDB...")
+            streams = aws_client("dynamodbstreams", region_name=REGION)
+            csv_file_path, total = export_changes(dynamodb, streams, table_name, output_dir, delimiter=delimiter)
+        else:
+            logger.info("Comenzando escaneo de la tabla DynamoDB...")
+            # Escribir los datos en formato CSV en streaming, página por página
+            csv_file_path, total = export_table(dynamodb, table_name, output_dir, delimiter=delimiter,
+                                               total_segments=scan_segments(table_name), max_workers=workers,
+                                               rate_limiter=rate_limiter, columns=columns, query=query)
+        if total:
+            logger.success(f"Exportación completada con éxito. Archivo guardado en {csv_file_path}. Total de registros exportados: {total}")
+        else:
+            logger.warning("No se encontraron registros para exportar.")
+        return True
+    except Exception as e:
+        logger.error(f"Error durante la exportación: {str(e)}")
+        return False
+    finally:
+        end_time = datetime.now()
+        logger.info(f"Exportación finalizada. Tiempo total: {end_time - start_time}")
+
+
+def pull_table(table_name, log_file_path, argv=None):
+    # Cuerpo del main() de cada t_*/pull_*.py; True si la exportación terminó bien
+    setup_logging(log_file_path)
+    with stage_metrics("pull", table_name) as metrics:
+        return metrics.done(export_table_to_csv_dynamodb(table_name,
+                                                         argv=sys.argv[1:] if argv is None else argv))
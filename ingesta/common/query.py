@@ -0,0 +1,109 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+from loguru import logger
+from common.scan import DEFAULT_QUEUE_SIZE, fan_in, read_pages
+from common.tables import TABLES, TENANTS
+
+# Exportación por Query en lugar de Scan: una consulta por tenant (clave de partición),
+# en paralelo, opcionalmente acotada a un rango de fechas. Con un GSI (tenant_id, fecha)
+# configurado en "date_index" el rango va en la KeyConditionExpression y solo se leen los
+# elementos del rango; sin él se lee la partición del tenant y el rango se filtra.
+EXPORT_INDEX = os.getenv("EXPORT_INDEX") or None
+
+
+def _parse_list(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else None
+
+
+def resolve_query(table_name, argv=None, now=None):
+    # --tenants wong,uwu --since 2026-10-01 --until 2026-10-31 --last-days 7
+    # (o EXPORT_TENANTS, EXPORT_SINCE, EXPORT_UNTIL, EXPORT_LAST_DAYS). None = escaneo completo.
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--tenants")
+    parser.add_argument("--since")
+    parser.add_argument("--until")
+    parser.add_argument("--last-days", type=float)
+    args, _ = parser.parse_known_args(argv or [])
+    tenants = _parse_list(args.tenants or os.getenv("EXPORT_TENANTS"))
+    since = args.since or os.getenv("EXPORT_SINCE")
+    until = args.until or os.getenv("EXPORT_UNTIL")
+    last_days = args.last_days or float(os.getenv("EXPORT_LAST_DAYS", "0"))
+    if last_days and not since:
+        # Solo la fecha: las tablas guardan la hora con "T" (isoformat) o con espacio
+        # (pf_usuarios) y ' ' < 'T', así que un prefijo con hora descartaría filas del primer día
+        since = f"{(now or datetime.now()) - timedelta(days=last_days):%Y-%m-%d}"
+    if not tenants and not since and not until:
+        return None
+
+    config = TABLES.get(table_name, {})
+    date_field = config.get("partition_date")
+    if (since or until) and not date_field:
+        raise ValueError(f"La tabla '{table_name}' no tiene atributo de fecha para filtrar por rango.")
+    return {
+        "tenants": tenants or list(TENANTS),
+        "date_field": date_field if since or until else None,
+        "since": since,
+        "until": until,
+        "index": (EXPORT_INDEX or config.get("date_index")) if since or until else None,
+    }
+
+
+def query_name(query):
+    return "-".join(query["tenants"])
+
+
+def _date_condition(query):
+    # Condición sobre el atributo de fecha (texto ISO, comparable como cadena)
+    names = {"#qd": query["date_field"]}
+    if query["since"] and query["until"]:
+        # "until" es inclusivo por día: 2026-10-31 incluye 2026-10-31T23:59:59
+        values = {":qs": {"S": query["since"]}, ":qu": {"S": query["until"] + "\uffff"}}
+        return "#qd BETWEEN :qs AND :qu", names, values
+    if query["since"]:
+        return "#qd >= :qs", names, {":qs": {"S": query["since"]}}
+    return "#qd <= :qu", names, {":qu": {"S": query["until"] + "\uffff"}}
+
+
+def query_request(table_name, query, tenant, **extra_kwargs):
+    # Parámetros de Query para un tenant; extra_kwargs (proyección) se combinan con los propios
+    key_condition = "#qt = :qt"
+    names = dict(extra_kwargs.pop("ExpressionAttributeNames", {}), **{"#qt": "tenant_id"})
+    values = dict(extra_kwargs.pop("ExpressionAttributeValues", {}), **{":qt": {"S": tenant}})
+    request = dict(TableName=table_name, **extra_kwargs)
+    if query["date_field"]:
+        condition, date_names, date_values = _date_condition(query)
+        names.update(date_names)
+        values.update(date_values)
+        if query["index"]:
+            request["IndexName"] = query["index"]
+            key_condition += f" AND {condition}"
+        else:
+            request["FilterExpression"] = condition
+    request["KeyConditionExpression"] = key_condition
+    request["ExpressionAttributeNames"] = names
+    request["ExpressionAttributeValues"] = values
+    return request
+
+
+def parallel_query(dynamodb, table_name, query, max_workers=None, queue_size=DEFAULT_QUEUE_SIZE, segments=None,
+                   start_keys=None, rate_limiter=None, **extra_kwargs):
+    # Una consulta paginada por tenant en un pool de hilos. Devuelve (posición del tenant, página)
+    # como parallel_scan devuelve (segmento, página), así el punto de control funciona igual.
+    tenants = query["tenants"]
+    segments = list(range(len(tenants))) if segments is None else list(segments)
+    start_keys = start_keys or {}
+    if not segments:
+        return
+    if query["date_field"] and not query["index"]:
+        logger.warning(f"'{table_name}' sin índice por fecha: se lee la partición completa de cada tenant "
+                       f"y el rango sobre '{query['date_field']}' se aplica como filtro.")
+    logger.info(f"Query de '{table_name}' para {len(segments)} tenants con {max_workers or len(segments)} hilos.")
+    sources = {}
+    for segment in segments:
+        request = query_request(table_name, query, tenants[segment], **extra_kwargs)
+        if start_keys.get(segment):
+            request["ExclusiveStartKey"] = start_keys[segment]
+        sources[segment] = read_pages(dynamodb.query, request, table_name, f"tenant {tenants[segment]}",
+                                      rate_limiter)
+    yield from fan_in(sources, max_workers or len(segments), queue_size)
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import BotoCoreError, ClientError
+from loguru import logger
+from common.metrics import current
+from common.parts import CHECKSUM_ALGORITHM, MappedFile, PartBody, checksums
+from common.watermark import STATE_DIRECTORY
+
+# Subidas multipart reanudables: el UploadId y los ETag de las partes completadas se
+# guardan en state/uploads/. Si la subida se corta, la siguiente ejecución consulta
+# ListParts y solo sube las partes que faltan. Cada parte se reintenta con espera
+# exponencial (con jitter) antes de dar la subida por fallida.
+UPLOAD_STATE_DIRECTORY = os.path.join(STATE_DIRECTORY, "uploads")
+UPLOAD_PART_RETRIES = int(os.getenv("UPLOAD_PART_RETRIES", "5"))
+UPLOAD_RETRY_BASE_SECONDS = float(os.getenv("UPLOAD_RETRY_BASE_SECONDS", "0.5"))
+UPLOAD_RETRY_MAX_SECONDS = float(os.getenv("UPLOAD_RETRY_MAX_SECONDS", "20"))
+
+# Errores que no se arreglan reintentando la misma parte
+FATAL_ERROR_CODES = {"AccessDenied", "NoSuchBucket", "NoSuchUpload", "InvalidAccessKeyId", "SignatureDoesNotMatch"}
+
+
+def with_backoff(operation, label):
+    # Ejecuta operation() reintentando errores transitorios: espera aleatoria entre 0 y
+    # base * 2^intento (acotada), así varios hilos no reintentan todos a la vez
+    for attempt in range(UPLOAD_PART_RETRIES + 1):
+        try:
+            return operation()
+        except (ClientError, BotoCoreError, OSError) as e:
+            code = e.response["Error"]["Code"] if isinstance(e, ClientError) else None
+            if code in FATAL_ERROR_CODES or attempt == UPLOAD_PART_RETRIES:
+                raise
+            delay = random.uniform(0, min(UPLOAD_RETRY_MAX_SECONDS, UPLOAD_RETRY_BASE_SECONDS * 2 ** attempt))
+            logger.warning(f"{label}: intento {attempt + 1} fallido ({str(e)}). Reintentando en {delay:.1f} s.")
+            time.sleep(delay)
+
+
+def _state_path(bucket, key):
+    name = hashlib.sha1(f"{bucket}/{key}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(UPLOAD_STATE_DIRECTORY, f"{name}.json")
+
+
+def _fingerprint(path):
+    # Identifica la versión del archivo sin volver a leerlo
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class UploadState:
+
+    def __init__(self, bucket, key, state=None):
+        self.bucket = bucket
+        self.key = key
+        self.path = _state_path(bucket, key)
+        self.state = state or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, bucket, key):
+        upload_state = cls(bucket, key)
+        if os.path.exists(upload_state.path):
+            with open(upload_state.path, encoding="utf-8") as state_file:
+                upload_state.state = json.load(state_file)
+        return upload_state
+
+    def part_done(self, part_number, part):
+        with self._lock:
+            self.state.setdefault("parts", {})[str(part_number)] = part
+            self._save()
+
+    def _save(self):
+        os.makedirs(UPLOAD_STATE_DIRECTORY, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(self.state, state_file)
+        os.replace(tmp_path, self.path)
+
+    def start(self, upload_id, fingerprint, part_size):
+        with self._lock:
+            self.state = {"bucket": self.bucket, "key": self.key, "upload_id": upload_id, "source": fingerprint,
+                          "part_size": part_size, "checksum": CHECKSUM_ALGORITHM, "parts": {}}
+            self._save()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _list_parts(s3, bucket, key, upload_id):
+    # Partes que S3 ya tiene: {número: (ETag, CRC32, tamaño)}
+    parts = {}
+    kwargs = {"Bucket": bucket, "Key": key, "UploadId": upload_id}
+    while True:
+        response = s3.list_parts(**kwargs)
+        for part in response.get("Parts", []):
+            parts[part["PartNumber"]] = (part["ETag"], part.get("ChecksumCRC32"), part["Size"])
+        if not response.get("IsTruncated"):
+            return parts
+        kwargs["PartNumberMarker"] = response["NextPartNumberMarker"]
+
+
+def _resume(s3, upload_state, fingerprint, part_size):
+    # Devuelve las partes reutilizables de una subida anterior del mismo archivo, o None
+    state = upload_state.state
+    if not state.get("upload_id"):
+        return None
+    if (state.get("source") != fingerprint or state.get("part_size") != part_size
+            or state.get("checksum") != CHECKSUM_ALGORITHM):
+        logger.info(f"'{upload_state.key}' cambió desde la subida interrumpida; se descarta y empieza de cero.")
+        try:
+            s3.abort_multipart_upload(Bucket=upload_state.bucket, Key=upload_state.key, UploadId=state["upload_id"])
+        except ClientError:
+            pass
+        return None
+    try:
+        listed = _list_parts(s3, upload_state.bucket, upload_state.key, state["upload_id"])
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchUpload":
+            raise
+        logger.info(f"La subida interrumpida de '{upload_state.key}' ya no existe en S3; se empieza de cero.")
+        return None
+    # Solo cuentan las partes completas según S3 (la última puede ser menor) y con CRC32
+    # conocido: el de ListParts o, si no viene, el guardado al subir esa misma parte
+    expected = lambda number: min(part_size, fingerprint["upload_size"] - (number - 1) * part_size)
+    saved = state.get("parts", {})
+    reusable = {}
+    for number, (etag, crc, size) in listed.items():
+        local = saved.get(str(number), {})
+        crc = crc or (local.get("ChecksumCRC32") if local.get("ETag") == etag else None)
+        if crc and size == expected(number):
+            reusable[number] = {"ETag": etag, "ChecksumCRC32": crc}
+    return reusable
+
+
+def resumable_upload(s3, file_path, bucket, key, part_size, concurrency, extra_args=None, source_path=None,
+                     slots=None):
+    # Subida multipart de file_path reanudable entre ejecuciones. source_path identifica la
+    # versión del contenido cuando file_path es un temporal regenerado (p. ej. comprimido).
+    # slots (semáforo opcional) limita las partes en vuelo entre varias subidas simultáneas.
+    fingerprint = _fingerprint(source_path or file_path)
+    file_size = os.path.getsize(file_path)
+    fingerprint["upload_size"] = file_size
+    total_parts = max(1, math.ceil(file_size / part_size))
+    upload_state = UploadState.load(bucket, key)
+    done = _resume(s3, upload_state, fingerprint, part_size)
+    if done is None:
+        upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ChecksumAlgorithm=CHECKSUM_ALGORITHM,
+                                               **(extra_args or {}))["UploadId"]
+        upload_state.start(upload_id, fingerprint, part_size)
+        done = {}
+    else:
+        upload_id = upload_state.state["upload_id"]
+        upload_state.state["parts"] = {str(number): part for number, part in done.items()}
+        logger.info(f"Reanudando '{key}': {len(done)} de {total_parts} partes ya subidas.")
+
+    def upload_part(part_number):
+        # La parte es una vista sobre el archivo mapeado: las sumas y el envío leen las
+        # mismas páginas, sin copiarlas a un bytes de tamaño de parte
+        view = mapped.part(part_number, part_size)
+        try:
+            content_md5, crc32 = checksums(view)
+
+            request = {"ChecksumCRC32": crc32}
+            if content_md5:
+                request["ContentMD5"] = content_md5
+
+            def send():
+                with slots or nullcontext():
+                    return s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number,
+                                          Body=PartBody(view), **request)["ETag"]
+            part = {"ETag": with_backoff(send, f"Parte {part_number} de '{key}'"), "ChecksumCRC32": crc32}
+        finally:
+            view.release()
+        upload_state.part_done(part_number, part)
+        return part_number, part
+
+    missing = [number for number in range(1, total_parts + 1) if number not in done]
+    metrics = current()
+    with MappedFile(file_path) as mapped, \
+            ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing) or 1))) as pool:
+        # Si una parte agota sus reintentos el error sale aquí; el estado queda guardado
+        # para que la próxima ejecución retome desde las partes completadas
+        for part_number, part in pool.map(upload_part, missing):
+            done[part_number] = part
+            metrics.add("uploaded_bytes", min(part_size, file_size - (part_number - 1) * part_size))
+
+    parts = [dict(done[number], PartNumber=number) for number in range(1, total_parts + 1)]
+    with_backoff(lambda: s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                      MultipartUpload={"Parts": parts}),
+                 f"Completar '{key}'")
+    upload_state.clear()
+    return total_parts, len(missing)
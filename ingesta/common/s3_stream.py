@@ -0,0 +1,193 @@
+import csv
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from common.clients import aws_client
+from common.compression import CODECS, BlockCompressor, active_codec
+from common.metrics import current
+from common.resumable import with_backoff
+from common.sinks import CsvSink
+from common.tables import TABLES
+from common.transfer import UPLOAD_MAX_CONCURRENCY
+
+# Bucket de destino y endpoint alternativo (MinIO, LocalStack...) para pruebas locales
+S3_BUCKET = os.getenv("S3_BUCKET", "aproyecto-dev")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+# Tamaño de cada parte del multipart (S3 exige al menos 5 MB salvo en la última)
+S3_PART_SIZE_MB = max(5, int(os.getenv("S3_PART_SIZE_MB", "8")))
+# Partes subiéndose a la vez; la memoria usada es ~(concurrencia + 1) * tamaño de parte
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
+
+
+def s3_client():
+    # Pool de conexiones suficiente para la concurrencia máxima de las subidas multipart;
+    # el cliente se crea al primer uso y se comparte en el proceso
+    return aws_client("s3", max(10, UPLOAD_MAX_CONCURRENCY, S3_UPLOAD_CONCURRENCY), endpoint_url=S3_ENDPOINT_URL)
+
+
+def s3_key(table_name, file_name, folder=None):
+    # Misma clave que usaría el load_*.py con el archivo local. Los deltas, cambios y consultas
+    # (folder: "deltas", "cdc", "queries") van a <folder>/<prefijo>/..., fuera del prefijo de la
+    # tabla que leen Athena/Glue, para no duplicar filas de la exportación completa
+    prefix = TABLES.get(table_name, {}).get("s3_prefix", table_name)
+    return f"{folder}/{prefix}/{file_name}" if folder else f"{prefix}/{file_name}"
+
+
+class S3MultipartSink(CsvSink):
+    # Escribe el CSV directamente en S3: las filas se acumulan en un búfer en memoria y
+    # cada vez que alcanza el tamaño de parte se sube con upload_part en segundo plano,
+    # mientras el escaneo continúa. close() sube la última parte y completa el objeto (sin
+    # filas no sube nada); abort() descarta la subida para no dejar un CSV a medias en el bucket.
+    # Con COMPRESSION el búfer se comprime por bloques y las partes llevan los bytes comprimidos.
+
+    def __init__(self, s3, bucket, key, delimiter=";", fieldnames=None):
+        self.codec = active_codec()
+        if self.codec:
+            key += CODECS[self.codec]["suffix"]
+        super().__init__(f"s3://{bucket}/{key}", delimiter, fieldnames=fieldnames)
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = S3_PART_SIZE_MB * 1024 * 1024
+        self.uploaded_bytes = 0
+        self._object_args = {"ContentEncoding": CODECS[self.codec]["encoding"]} if self.codec else {}
+        self._compressor = BlockCompressor(self.codec) if self.codec else None
+        # Bytes listos para subir (ya comprimidos si aplica) que aún no forman una parte
+        self._pending = bytearray()
+        self._upload_id = None
+        self._futures = []
+        self._pool = ThreadPoolExecutor(max_workers=S3_UPLOAD_CONCURRENCY)
+        self._slots = threading.BoundedSemaphore(S3_UPLOAD_CONCURRENCY)
+        self._lock = threading.Lock()
+        self._finished = False
+        # Las partes se suben en hilos del pool: las métricas se toman de la etapa que crea el sink
+        self._metrics = current()
+        self._metrics.watch("s3_parts", lambda: sum(not future.done() for future in self._futures),
+                            S3_UPLOAD_CONCURRENCY)
+        self._upload_start = None
+
+    def _open(self, row):
+        if self.fieldnames is None:
+            self.fieldnames = list(row.keys())
+        self._file = io.StringIO(newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, delimiter=self.delimiter)
+        self._writer.writeheader()
+
+    def write(self, row):
+        super().write(row)
+        threshold = self._compressor.block_size if self._compressor else self.part_size
+        if self._file.tell() >= threshold:
+            self._drain_buffer()
+
+    def _drain_buffer(self, final=False):
+        # Pasa el texto del búfer a bytes para subir y sube una parte si ya hay suficientes
+        data = b""
+        if self._file is not None:
+            data = self._file.getvalue().encode("utf-8")
+            self._file.seek(0)
+            self._file.truncate()
+        if self._compressor is None:
+            self._pending += data
+        else:
+            for chunk in self._compressor.feed(data):
+                self._pending += chunk
+            if final:
+                for chunk in self._compressor.finish():
+                    self._pending += chunk
+        if len(self._pending) >= self.part_size:
+            self._upload_pending()
+
+    def _upload_pending(self):
+        # Un fallo en una parte anterior detiene la exportación cuanto antes
+        for future in self._futures:
+            if future.done() and future.exception():
+                raise future.exception()
+        data = bytes(self._pending)
+        self._pending.clear()
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                                              **self._object_args)["UploadId"]
+            logger.info(f"Subida multipart iniciada para 's3://{self.bucket}/{self.key}'.")
+            self._upload_start = time.perf_counter()
+        part_number = len(self._futures) + 1
+        # Si todas las ranuras están ocupadas el escaneo espera: limita la memoria en uso
+        self._slots.acquire()
+        future = self._pool.submit(self._upload_part, part_number, data)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, part_number, data):
+        response = with_backoff(lambda: self.s3.upload_part(Bucket=self.bucket, Key=self.key,
+                                                            UploadId=self._upload_id, PartNumber=part_number,
+                                                            Body=data),
+                                f"Parte {part_number} de '{self.key}'")
+        with self._lock:
+            self.uploaded_bytes += len(data)
+        self._metrics.add("uploaded_bytes", len(data))
+        logger.info(f"Parte {part_number} de '{self.key}' subida ({len(data) / 1024 / 1024:.1f} MB).")
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def position(self):
+        # Bytes generados hasta ahora (subidos, pendientes o en el búfer de texto)
+        buffered = self._file.tell() if self._file is not None else 0
+        return self.uploaded_bytes + len(self._pending) + buffered
+
+    def suspend(self):
+        # No hay archivo que cerrar: el búfer sigue en memoria hasta completar la parte
+        pass
+
+    def close(self):
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            if self.rows == 0:
+                # Sin filas no hay nada que publicar: un objeto vacío (sin cabecera) reemplazaría
+                # al CSV anterior o dejaría un delta vacío en el bucket
+                logger.info(f"Sin registros: no se sube 's3://{self.bucket}/{self.key}'.")
+                return
+            self._drain_buffer(final=True)
+            if self._upload_id is None:
+                # Todo cupo en una parte: basta un put_object
+                body = bytes(self._pending)
+                self._upload_start = time.perf_counter()
+                self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=body, **self._object_args)
+                self.uploaded_bytes = len(body)
+                self._metrics.add("uploaded_bytes", len(body))
+            else:
+                if self._pending:
+                    self._upload_pending()
+                parts = [future.result() for future in self._futures]
+                self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                                  MultipartUpload={"Parts": parts})
+            self._metrics.add("uploaded_files")
+            self._metrics.add("upload_seconds", time.perf_counter() - self._upload_start)
+            logger.info(f"Objeto 's3://{self.bucket}/{self.key}' completado: {self.uploaded_bytes / 1024:.1f} KB "
+                        f"en {max(1, len(self._futures))} partes.")
+            if self._compressor is not None:
+                logger.info(f"Compresión {self.codec}: {self._compressor.raw_bytes / 1024:.1f} KB -> "
+                            f"{self._compressor.compressed_bytes / 1024:.1f} KB ({self._compressor.ratio():.1f}x).")
+        except BaseException:
+            self._abort_upload()
+            raise
+        finally:
+            self._pool.shutdown(wait=True)
+            self._metrics.unwatch("s3_parts")
+
+    def abort(self):
+        if self._finished:
+            return
+        self._finished = True
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._metrics.unwatch("s3_parts")
+        self._abort_upload()
+
+    def _abort_upload(self):
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            logger.warning(f"Subida multipart de 's3://{self.bucket}/{self.key}' abortada.")
+            self._upload_id = None
@@ -0,0 +1,149 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from loguru import logger
+from common.metrics import current
+from common.throttle import MAX_THROTTLE_RETRIES, THROTTLE_ERROR_CODES
+
+# Valores por defecto del escaneo paralelo
+DEFAULT_QUEUE_SIZE = 8
+# Páginas que se piden por adelantado en el escaneo de un solo segmento mientras
+# se procesa la actual (0 = sin prefetch, la siguiente petición espera al consumidor)
+SCAN_PREFETCH_PAGES = int(os.getenv("SCAN_PREFETCH_PAGES", "2"))
+
+# Marcador de fin de segmento dentro de la cola
+_DONE = object()
+
+
+def read_pages(operation, request, table_name, label, rate_limiter=None):
+    # Pagina una operación de lectura (scan/query) siguiendo LastEvaluatedKey.
+    # Con rate_limiter cada página espera su turno y descuenta las RCU consumidas.
+    # Las RCU se piden siempre (no tienen costo) para las métricas de la etapa.
+    request = dict(request, ReturnConsumedCapacity="TOTAL")
+
+    throttled = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            page = operation(**request)
+        except ClientError as e:
+            if rate_limiter is None or e.response["Error"]["Code"] not in THROTTLE_ERROR_CODES:
+                raise
+            throttled += 1
+            if throttled > MAX_THROTTLE_RETRIES:
+                raise
+            logger.warning(f"Lectura limitada en '{table_name}' ({label}); reduciendo la tasa.")
+            rate_limiter.on_throttle()
+            continue
+        throttled = 0
+        if rate_limiter is not None:
+            rate_limiter.record_page(page)
+        yield page
+        last_key = page.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        request["ExclusiveStartKey"] = last_key
+
+
+def scan_segment(dynamodb, table_name, segment=0, total_segments=1, start_key=None, rate_limiter=None,
+                 **scan_kwargs):
+    # Recorre un segmento de la tabla página por página
+    request = dict(TableName=table_name, **scan_kwargs)
+    if total_segments > 1:
+        request["Segment"] = segment
+        request["TotalSegments"] = total_segments
+    if start_key:
+        request["ExclusiveStartKey"] = start_key
+    return read_pages(dynamodb.scan, request, table_name, f"segmento {segment}", rate_limiter)
+
+
+def fan_in(sources, max_workers, queue_size, name="pages"):
+    # Ejecuta cada generador en un hilo y entrega sus páginas por una cola acotada.
+    # Devuelve tuplas (id_fuente, página) en orden de llegada a un único consumidor.
+    # La ocupación de la cola va a las métricas (name): llena indica que el consumidor es
+    # el cuello de botella; vacía, que lo es la lectura.
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    metrics = current()
+    metrics.watch(name, pages.qsize, queue_size)
+
+    def put(entry):
+        # Evita bloquear un hilo para siempre si el consumidor ya terminó
+        while not stop.is_set():
+            try:
+                pages.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(source_id, source):
+        try:
+            for page in source:
+                if not put((source_id, page)):
+                    return
+        except Exception as e:
+            put((source_id, e))
+        finally:
+            put((source_id, _DONE))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for source_id, source in sources.items():
+            pool.submit(worker, source_id, source)
+
+        pending = len(sources)
+        try:
+            while pending:
+                source_id, page = pages.get()
+                if page is _DONE:
+                    pending -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                yield source_id, page
+        finally:
+            stop.set()
+            metrics.unwatch(name)
+
+
+def prefetch(source, depth=SCAN_PREFETCH_PAGES):
+    # Recorre el generador en un hilo aparte con hasta `depth` páginas ya recibidas en
+    # cola, así la petición de la página N+1 viaja mientras se procesa la página N.
+    if depth <= 0:
+        yield from source
+        return
+    for _, page in fan_in({0: source}, max_workers=1, queue_size=depth):
+        yield page
+
+
+def parallel_scan(dynamodb, table_name, total_segments=1, max_workers=None,
+                  queue_size=DEFAULT_QUEUE_SIZE, segments=None, start_keys=None, rate_limiter=None,
+                  prefetch_pages=SCAN_PREFETCH_PAGES, **scan_kwargs):
+    # Escaneo segmentado (Segment/TotalSegments) repartido en un pool de hilos.
+    # Devuelve tuplas (segmento, página); el consumidor es el único escritor.
+    # segments/start_keys permiten reanudar: solo los segmentos pendientes y desde su última clave.
+    # Con un solo segmento las páginas se piden por adelantado (prefetch_pages); con varios
+    # la cola acotada del fan-in ya cumple esa función.
+    segments = list(range(total_segments)) if segments is None else list(segments)
+    start_keys = start_keys or {}
+    if not segments:
+        return
+
+    if total_segments <= 1:
+        pages = scan_segment(dynamodb, table_name, start_key=start_keys.get(0),
+                             rate_limiter=rate_limiter, **scan_kwargs)
+        for page in prefetch(pages, prefetch_pages):
+            yield 0, page
+        return
+
+    max_workers = max_workers or len(segments)
+    logger.info(f"Escaneo paralelo de '{table_name}' con {len(segments)}/{total_segments} segmentos y {max_workers} hilos.")
+    sources = {
+        segment: scan_segment(dynamodb, table_name, segment, total_segments,
+                              start_key=start_keys.get(segment), rate_limiter=rate_limiter, **scan_kwargs)
+        for segment in segments
+    }
+    yield from fan_in(sources, max_workers, queue_size)
@@ -0,0 +1,231 @@
+import csv
+import marshal
+import os
+import re
+from collections import OrderedDict
+from loguru import logger
+
+# Máximo de archivos de partición abiertos a la vez (el resto se cierra y se reabre en modo append)
+MAX_OPEN_PARTITIONS = int(os.getenv("MAX_OPEN_PARTITIONS", "64"))
+
+# Valor de partición cuando el atributo no existe (convención de Hive)
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Búfer de escritura/lectura del archivo de volcado de SchemaUnionSink
+SPILL_BUFFER_BYTES = 1024 * 1024
+
+
+class CsvSink:
+    # Escritor CSV en streaming: cada fila va directo al archivo, sin acumular en memoria.
+    # La cabecera sale del primer elemento salvo que se indique (p.ej. al reanudar);
+    # con offset se trunca el archivo parcial a ese byte y se continúa escribiendo.
+
+    def __init__(self, csv_file_path, delimiter=";", fieldnames=None, offset=None):
+        self.path = csv_file_path
+        self.delimiter = delimiter
+        self.fieldnames = fieldnames
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._mode = "w"
+        self._ignored_fields = set()
+        if offset is not None and fieldnames:
+            os.truncate(csv_file_path, offset)
+            self._mode = "a"
+
+    def _open(self, row):
+        if self.fieldnames is None:
+            self.fieldnames = list(row.keys())
+        self._file = open(self.path, mode=self._mode, newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, delimiter=self.delimiter)
+        if self._mode == "w":
+            self._writer.writeheader()
+        # Si se suspende y se vuelve a abrir, se continúa al final del archivo
+        self._mode = "a"
+
+    def write(self, row):
+        if self._writer is None:
+            self._open(row)
+        try:
+            self._writer.writerow(row)
+        except ValueError:
+            # Atributos que no estaban en el primer elemento: se descartan con aviso
+            extra_fields = row.keys() - set(self.fieldnames)
+            new_fields = extra_fields - self._ignored_fields
+            if new_fields:
+                logger.warning(f"Columnas no presentes en la cabecera, se omiten: {sorted(new_fields)}")
+                self._ignored_fields |= new_fields
+            self._writer.writerow({k: v for k, v in row.items() if k not in extra_fields})
+        self.rows += 1
+
+    def position(self):
+        # Bytes escritos hasta ahora (tras vaciar el búfer)
+        if self._file is not None:
+            self._file.flush()
+            return self._file.tell()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def suspend(self):
+        # Cierra el archivo sin perder el estado; se reabre en la siguiente escritura
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def close(self):
+        self.suspend()
+
+
+def _partition_value(value):
+    if value is None or value == "":
+        return DEFAULT_PARTITION
+    return re.sub(r"[/\\=\s]", "_", str(value))
+
+
+class PartitionedCsvSink:
+    # Salida particionada al estilo Hive: <dir>/tenant_id=<t>/dt=<YYYY-MM-DD>/<part_name>.
+    # Todas las particiones comparten cabecera (la del primer elemento exportado).
+    # position() devuelve {ruta: bytes} para los puntos de control.
+
+    def __init__(self, directory, part_name, delimiter=";", date_field=None, default_date=None,
+                 fieldnames=None, offsets=None):
+        self.directory = directory
+        self.part_name = part_name
+        self.delimiter = delimiter
+        self.date_field = date_field
+        self.default_date = default_date
+        self.fieldnames = fieldnames
+        self.rows = 0
+        self._sinks = {}
+        self._open_sinks = OrderedDict()
+        if offsets is not None:
+            self._resume(offsets)
+
+    def _resume(self, offsets):
+        # Trunca cada partición a su desplazamiento y borra las creadas después del punto de control
+        for root, _, files in os.walk(self.directory):
+            if self.part_name not in files:
+                continue
+            path = os.path.join(root, self.part_name)
+            offset = offsets.get(path)
+            if not offset or not self.fieldnames:
+                os.remove(path)
+                continue
+            self._sinks[path] = CsvSink(path, self.delimiter, fieldnames=self.fieldnames, offset=offset)
+
+    def partition_path(self, row):
+        tenant = _partition_value(row.get("tenant_id"))
+        date = row.get(self.date_field) if self.date_field else None
+        day = _partition_value(str(date)[:10] if date else self.default_date)
+        return os.path.join(self.directory, f"tenant_id={tenant}", f"dt={day}", self.part_name)
+
+    def _sink_for(self, path):
+        sink = self._sinks.get(path)
+        if sink is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            sink = self._sinks[path] = CsvSink(path, self.delimiter, fieldnames=self.fieldnames)
+        if path in self._open_sinks:
+            self._open_sinks.move_to_end(path)
+        else:
+            self._open_sinks[path] = sink
+            if len(self._open_sinks) > MAX_OPEN_PARTITIONS:
+                _, oldest = self._open_sinks.popitem(last=False)
+                oldest.suspend()
+        return sink
+
+    def write(self, row):
+        if self.fieldnames is None:
+            self.fieldnames = list(row.keys())
+        self._sink_for(self.partition_path(row)).write(row)
+        self.rows += 1
+
+    def position(self):
+        return {path: sink.position() for path, sink in self._sinks.items()}
+
+    @property
+    def partitions(self):
+        return len(self._sinks)
+
+    def close(self):
+        for sink in self._sinks.values():
+            sink.close()
+        self._open_sinks.clear()
+
+
+class SchemaUnionSink:
+    # Cabecera con la unión de todos los atributos sin volver a escanear ni cargar la tabla:
+    # cada fila se vuelca a un archivo binario (marshal, una tupla de valores por posición de
+    # columna, sin repetir nombres) mientras se van descubriendo columnas. finish() escribe la
+    # salida real (CsvSink o PartitionedCsvSink, vía open_target) en una pasada secuencial.
+    # En CSV un atributo ausente y uno nulo se escriben igual, así que None rellena los huecos.
+    # position()/fieldnames permiten reanudar: se trunca el volcado y se recupera la unión.
+
+    def __init__(self, spill_path, open_target, fieldnames=None, offset=None):
+        self.path = spill_path
+        self.open_target = open_target
+        self.fieldnames = list(fieldnames or [])
+        self.rows = 0
+        self.target = None
+        self._index = {name: position for position, name in enumerate(self.fieldnames)}
+        self._mode = "wb"
+        if offset is not None and os.path.exists(spill_path):
+            os.truncate(spill_path, offset)
+            self._mode = "ab"
+        self._file = None
+
+    def write(self, row):
+        if self._file is None:
+            self._file = open(self.path, self._mode, buffering=SPILL_BUFFER_BYTES)
+            self._mode = "ab"
+        index = self._index
+        values = [None] * len(self.fieldnames)
+        for name, value in row.items():
+            position = index.get(name)
+            if position is None:
+                position = index[name] = len(self.fieldnames)
+                self.fieldnames.append(name)
+                values.append(None)
+            values[position] = value
+        marshal.dump(tuple(values), self._file)
+        self.rows += 1
+
+    def position(self):
+        if self._file is not None:
+            self._file.flush()
+            return self._file.tell()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _replay(self):
+        with open(self.path, "rb", buffering=SPILL_BUFFER_BYTES) as spill_file:
+            while True:
+                try:
+                    yield marshal.load(spill_file)
+                except EOFError:
+                    return
+
+    def finish(self):
+        # Escribe la salida definitiva con la cabecera completa y elimina el volcado
+        self.close()
+        self.target = self.open_target(self.fieldnames)
+        fieldnames = self.fieldnames
+        try:
+            if self.rows:
+                for values in self._replay():
+                    self.target.write(dict(zip(fieldnames, values)))
+        finally:
+            self.target.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        logger.info(f"{self.target.rows} registros escritos con {len(fieldnames)} columnas desde '{self.path}'.")
+
+    @property
+    def partitions(self):
+        return self.target.partitions if self.target is not None else 0
+
+    def suspend(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self.suspend()
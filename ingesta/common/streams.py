@@ -0,0 +1,215 @@
+import json
+import os
+import time
+from datetime import datetime
+from botocore.exceptions import ClientError
+from loguru import logger
+from common.deserializer import compile_row_decoder
+from common.metrics import current
+from common.scan import fan_in
+from common.sinks import CsvSink, SchemaUnionSink
+from common.tables import TABLES
+from common.watermark import STATE_DIRECTORY
+
+# Lectura de cambios (CDC) desde DynamoDB Streams, alternativa al escaneo completo.
+# Requiere StreamSpecification con NEW_IMAGE o NEW_AND_OLD_IMAGES en la tabla.
+STREAM_BATCH_LIMIT = int(os.getenv("STREAM_BATCH_LIMIT", "1000"))
+STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", "8"))
+# Pausa entre GetRecords vacíos de un shard abierto antes de darlo por alcanzado
+STREAM_IDLE_POLLS = int(os.getenv("STREAM_IDLE_POLLS", "2"))
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "1"))
+
+# Columnas de control de cada cambio, delante de los atributos del elemento
+CHANGE_FIELDS = ["_op", "_sequence_number", "_approximate_time"]
+OPERATIONS = {"INSERT": "insert", "MODIFY": "modify", "REMOVE": "remove"}
+
+
+def cdc_file_name(table_name, timestamp):
+    return f"{table_name}.cdc.{timestamp:%Y%m%dT%H%M%S}.csv"
+
+
+def stream_state_path(table_name):
+    return os.path.join(STATE_DIRECTORY, f"{table_name}.stream.json")
+
+
+def load_stream_state(table_name):
+    path = stream_state_path(table_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as state_file:
+        return json.load(state_file)
+
+
+def save_stream_state(table_name, state):
+    os.makedirs(STATE_DIRECTORY, exist_ok=True)
+    path = stream_state_path(table_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def latest_stream_arn(dynamodb, table_name):
+    table = dynamodb.describe_table(TableName=table_name)["Table"]
+    arn = table.get("LatestStreamArn")
+    if not arn or not table.get("StreamSpecification", {}).get("StreamEnabled"):
+        raise RuntimeError(f"La tabla '{table_name}' no tiene DynamoDB Streams habilitado.")
+    return arn
+
+
+def list_shards(streams, stream_arn):
+    shards = []
+    kwargs = {"StreamArn": stream_arn}
+    while True:
+        description = streams.describe_stream(**kwargs)["StreamDescription"]
+        shards += description.get("Shards", [])
+        last_shard = description.get("LastEvaluatedShardId")
+        if not last_shard:
+            return shards
+        kwargs["ExclusiveStartShardId"] = last_shard
+
+
+def _shard_iterator(streams, stream_arn, shard_id, sequence_number):
+    if sequence_number:
+        try:
+            return streams.get_shard_iterator(StreamArn=stream_arn, ShardId=shard_id,
+                                              ShardIteratorType="AFTER_SEQUENCE_NUMBER",
+                                              SequenceNumber=sequence_number)["ShardIterator"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TrimmedDataAccessException":
+                raise
+            logger.warning(f"El shard '{shard_id}' ya descartó registros posteriores a {sequence_number} "
+                           "(retención de 24 h); se continúa desde el más antiguo disponible.")
+    return streams.get_shard_iterator(StreamArn=stream_arn, ShardId=shard_id,
+                                      ShardIteratorType="TRIM_HORIZON")["ShardIterator"]
+
+
+def read_shard(streams, stream_arn, shard_id, sequence_number=None):
+    # Lotes de registros del shard hasta su final (shard cerrado) o hasta alcanzar el
+    # presente (shard abierto sin registros nuevos tras STREAM_IDLE_POLLS lecturas).
+    # El último lote lleva "closed" para saber si el shard terminó.
+    iterator = _shard_iterator(streams, stream_arn, shard_id, sequence_number)
+    idle = 0
+    while iterator:
+        response = streams.get_records(ShardIterator=iterator, Limit=STREAM_BATCH_LIMIT)
+        records = response.get("Records", [])
+        iterator = response.get("NextShardIterator")
+        if records:
+            idle = 0
+            yield {"records": records, "closed": False}
+            continue
+        idle += 1
+        if iterator and idle >= STREAM_IDLE_POLLS:
+            yield {"records": [], "closed": False}
+            return
+        if iterator:
+            time.sleep(STREAM_POLL_SECONDS)
+    yield {"records": [], "closed": True}
+
+
+def has_pending_changes(dynamodb, streams, table_name):
+    # Sondeo barato para el daemon: un GetRecords de un registro por shard sin terminar, desde
+    # el último número de secuencia procesado. No escribe estado ni avanza la posición.
+    stream_arn = latest_stream_arn(dynamodb, table_name)
+    state = load_stream_state(table_name)
+    if state.get("stream_arn") != stream_arn:
+        return True
+    progress = state.get("shards", {})
+    for shard in list_shards(streams, stream_arn):
+        shard_progress = progress.get(shard["ShardId"], {})
+        if shard_progress.get("closed"):
+            continue
+        iterator = _shard_iterator(streams, stream_arn, shard["ShardId"], shard_progress.get("sequence_number"))
+        if streams.get_records(ShardIterator=iterator, Limit=1).get("Records"):
+            return True
+    return False
+
+
+def change_row(record, decode):
+    # Fila compacta: la operación y la imagen nueva (o solo la clave si se eliminó)
+    change = record["dynamodb"]
+    created = change.get("ApproximateCreationDateTime")
+    image = change.get("NewImage") if record["eventName"] != "REMOVE" else None
+    row = {
+        "_op": OPERATIONS.get(record["eventName"], record["eventName"].lower()),
+        "_sequence_number": change["SequenceNumber"],
+        "_approximate_time": created.isoformat() if isinstance(created, datetime) else created,
+    }
+    row.update(decode(image if image is not None else change["Keys"]))
+    return row
+
+
+def export_changes(dynamodb, streams, table_name, output_dir, delimiter=";", max_workers=STREAM_WORKERS):
+    # Lee los shards del stream en paralelo desde el último número de secuencia procesado
+    # y escribe los cambios (insert/modify/remove) en <tabla>.cdc.<fecha>.csv para el load.
+    # Los shards hijos se leen después de sus padres para respetar el orden por clave.
+    # El estado solo avanza cuando el archivo quedó escrito completo.
+    # Devuelve (ruta del CSV, cambios exportados).
+    config = TABLES.get(table_name, {})
+    decode = compile_row_decoder(config.get("schema"))
+    stream_arn = latest_stream_arn(dynamodb, table_name)
+    state = load_stream_state(table_name)
+    if state.get("stream_arn") != stream_arn:
+        if state:
+            logger.warning(f"El stream de '{table_name}' cambió; se comienza desde el inicio del nuevo stream.")
+        state = {"stream_arn": stream_arn, "shards": {}}
+    progress = state["shards"]
+
+    shards = {shard["ShardId"]: shard for shard in list_shards(streams, stream_arn)}
+    pending = {shard_id: shard for shard_id, shard in shards.items()
+               if not progress.get(shard_id, {}).get("closed")}
+    logger.info(f"Stream de '{table_name}': {len(shards)} shards, {len(pending)} por leer.")
+
+    output = os.path.join(output_dir, cdc_file_name(table_name, datetime.now()))
+    sink = SchemaUnionSink(f"{output}.spill",
+                           lambda fieldnames: CsvSink(output, delimiter, fieldnames=fieldnames),
+                           fieldnames=CHANGE_FIELDS)
+    counts = dict.fromkeys(OPERATIONS.values(), 0)
+    metrics = current()
+    try:
+        while pending:
+            # Shards cuyo padre ya terminó (o no está en el stream): se leen en paralelo
+            ready = [shard_id for shard_id, shard in pending.items() if shard.get("ParentShardId") not in pending]
+            sources = {shard_id: read_shard(streams, stream_arn, shard_id,
+                                            progress.get(shard_id, {}).get("sequence_number"))
+                       for shard_id in ready}
+            for shard_id, batch in fan_in(sources, max_workers=max_workers, queue_size=max_workers * 2):
+                shard_progress = progress.setdefault(shard_id, {"sequence_number": None, "closed": False})
+                metrics.add("pages")
+                metrics.add("items", len(batch["records"]))
+                for record in batch["records"]:
+                    row = change_row(record, decode)
+                    sink.write(row)
+                    counts[row["_op"]] = counts.get(row["_op"], 0) + 1
+                    shard_progress["sequence_number"] = record["dynamodb"]["SequenceNumber"]
+                shard_progress["closed"] = batch["closed"]
+            for shard_id in ready:
+                del pending[shard_id]
+            # Un shard abierto alcanzado bloquea a sus hijos hasta la próxima ejecución
+            for shard_id, shard in list(pending.items()):
+                parent = shard.get("ParentShardId")
+                if parent in shards and not progress.get(parent, {}).get("closed"):
+                    del pending[shard_id]
+        sink.close()
+        if sink.rows:
+            sink.finish()
+            metrics.total("written_bytes", os.path.getsize(output))
+    except BaseException:
+        sink.close()
+        # El estado no avanzó y la próxima ejecución vuelve a leer estos cambios: un CSV a
+        # medias sobra (el load lo subiría como cambios)
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+    finally:
+        # El volcado solo sirve dentro de esta ejecución (finish ya lo borra si terminó)
+        if os.path.exists(sink.path):
+            os.remove(sink.path)
+
+    # Los shards cerrados que ya no aparecen en el stream (más de 24 h) se olvidan
+    state["shards"] = {shard_id: shard_progress for shard_id, shard_progress in progress.items()
+                       if shard_id in shards}
+    save_stream_state(table_name, state)
+    logger.info(f"Cambios de '{table_name}': {counts['insert']} altas, {counts['modify']} modificaciones, "
+                f"{counts['remove']} bajas.")
+    return (output if sink.rows else None), sink.rows
@@ -0,0 +1,141 @@
+# Configuración por tabla compartida por los exportadores.
+# "schema": tipo DynamoDB de cada atributo conocido (ver fakeData/*.py); las
+# estructuras con forma fija se describen como {"M": {...}} o {"L": tipo}.
+# "key": atributos de la clave primaria (tenant_id + clave de ordenación).
+# "watermark": atributo con la fecha de la última escritura (texto ISO ordenable) para la
+# exportación incremental. Debe actualizarse en cada put/update: una fecha de negocio
+# (creation_date, fecha_pago...) no crece con las escrituras y la incremental perdería filas.
+# "partition_date": atributo cuya fecha da la partición dt=YYYY-MM-DD (si no hay, la del día de exportación).
+# "s3_prefix": prefijo de la tabla en el bucket (el mismo que usan los load_*.py).
+# "date_index": GSI opcional (tenant_id + atributo de partition_date) para la exportación por Query.
+# "delimiter" (por defecto ";") y "segments" (por defecto 1) los usan los exportadores.
+# "stream": la tabla tiene DynamoDB Streams; con EXPORT_MODE=cdc se leen sus cambios en lugar de escanearla.
+
+# Tenants conocidos (clave de partición de todas las tablas)
+TENANTS = ["plazavea", "uwu", "wong"]
+
+TABLES = {
+    "pf_usuarios": {
+        "key": ["tenant_id", "user_id"],
+        "s3_prefix": "usuarios",
+        "schema": {
+            "tenant_id": "S",
+            "user_id": "S",
+            "password": "S",
+            "creation_date": "S",
+            "last_modified": "S",
+        },
+        "watermark": "last_modified",
+        "partition_date": "creation_date",
+        "delimiter": ",",
+    },
+    "pf_productos": {
+        "key": ["tenant_id", "product_id"],
+        "s3_prefix": "productos",
+        "schema": {
+            "tenant_id": "S",
+            "product_id": "S",
+            "product_name": "S",
+            "product_brand": "S",
+            "product_info": {"M": {
+                "category": "S",
+                "sub_category": "S",
+                "release_date": "S",
+                "features": "S",
+            }},
+            "product_price": "N",
+        },
+    },
+    "pf_ordenes": {
+        "key": ["tenant_id", "order_id"],
+        "s3_prefix": "ordenes",
+        "schema": {
+            "tenant_id": "S",
+            "order_id": "S",
+            "tu_id": "S",
+            "user_id": "S",
+            "user_info": {"M": {
+                "pais": "S",
+                "ciudad": "S",
+                "direccion": "S",
+                "codigo_postal": "S",
+            }},
+            "inventory_id": "S",
+            "creation_date": "S",
+            "shipping_date": "S",
+            "order_status": "S",
+            "products": {"L": {"M": {
+                "product_id": "S",
+                "quantity": "N",
+                "price": "N",
+            }}},
+            "total_price": "N",
+            "last_modified": "S",
+        },
+        "watermark": "last_modified",
+        "partition_date": "creation_date",
+        "stream": True,
+    },
+    "pf_pagos": {
+        "key": ["tenant_id", "pago_id"],
+        "s3_prefix": "pagos",
+        "schema": {
+            "tenant_id": "S",
+            "pago_id": "S",
+            "tu_id": "S",
+            "order_id": "S",
+            "user_id": "S",
+            "total": "N",
+            "fecha_pago": "S",
+            "user_info": "M",
+            "last_modified": "S",
+        },
+        "watermark": "last_modified",
+        "partition_date": "fecha_pago",
+        "stream": True,
+    },
+    "pf_comentario": {
+        "key": ["tenant_id", "pr_id"],
+        "s3_prefix": "comentario",
+        "schema": {
+            "tenant_id": "S",
+            "pr_id": "S",
+            "product_id": "S",
+            "review_id": "S",
+            "user_id": "S",
+            "comentario": "S",
+            "stars": "N",
+            "last_modification": "S",
+            "last_modified": "S",
+        },
+        "watermark": "last_modified",
+        "partition_date": "last_modification",
+    },
+    "pf_inventarios": {
+        "key": ["tenant_id", "inventory_id"],
+        "s3_prefix": "inventarios",
+        "schema": {
+            "tenant_id": "S",
+            "inventory_id": "S",
+            "inventory_name": "S",
+            "stock": "N",
+            "observations": "S",
+        },
+    },
+    "pf_inventarioprod": {
+        "key": ["tenant_id", "ip_id"],
+        "s3_prefix": "inventarioProd",
+        "schema": {
+            "tenant_id": "S",
+            "ip_id": "S",
+            "inventory_id": "S",
+            "product_id": "S",
+            "stock": "N",
+            "last_modification": "S",
+            "observaciones": "S",
+        },
+        "watermark": "last_modification",
+        "partition_date": "last_modification",
+        "segments": 8,
+    },
+}
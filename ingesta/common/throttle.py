@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from loguru import logger
+
+# Porcentaje de la capacidad de lectura provisionada que pueden usar las exportaciones
+READ_CAPACITY_PERCENT = float(os.getenv("READ_CAPACITY_PERCENT", "50"))
+# Límite absoluto en RCU/s (obligatorio para limitar tablas on-demand; tiene prioridad)
+READ_CAPACITY_LIMIT = float(os.getenv("READ_CAPACITY_LIMIT", "0"))
+
+# Errores de DynamoDB que indican que se superó la capacidad
+THROTTLE_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+MAX_THROTTLE_RETRIES = int(os.getenv("MAX_THROTTLE_RETRIES", "10"))
+
+
+class AdaptiveRateLimiter:
+    # Token bucket de RCU con control AIMD, compartido por todos los hilos de un escaneo.
+    # Antes de cada petición se espera a que el balde no esté en deuda; después se descuenta
+    # la capacidad consumida (ReturnConsumedCapacity). Cada página sin limitación sube la
+    # tasa un paso fijo hasta el objetivo; cada limitación la reduce a la mitad.
+
+    def __init__(self, max_rate, initial_rate=None, min_rate=1.0, increase_step=None,
+                 decrease_factor=0.5, burst_seconds=1.0):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = initial_rate or max_rate / 4
+        self.increase_step = increase_step or max_rate / 20
+        self.decrease_factor = decrease_factor
+        self.burst_seconds = burst_seconds
+        self.tokens = self.rate * burst_seconds
+        self.consumed = 0.0
+        self.throttles = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate * self.burst_seconds, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 0:
+                    return
+                wait = -self.tokens / self.rate
+            time.sleep(wait)
+
+    def consume(self, units, retried=False):
+        with self._lock:
+            self._refill()
+            self.tokens -= units
+            self.consumed += units
+            if retried:
+                # botocore ya reintentó por limitación: se trata como una señal de sobrecarga
+                self._decrease()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self):
+        with self._lock:
+            self._decrease()
+            # Obliga a esperar antes del siguiente intento
+            self.tokens = min(self.tokens, 0.0) - self.rate * self.burst_seconds
+
+    def _decrease(self):
+        self.throttles += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+    def set_max_rate(self, max_rate):
+        # Ajusta el techo en caliente (p. ej. al redistribuir un presupuesto compartido)
+        with self._lock:
+            self.max_rate = max_rate
+            self.increase_step = max_rate / 20
+            self.rate = min(self.rate, max_rate)
+
+    def record_page(self, page):
+        consumed = page.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0)
+        retried = page.get("ResponseMetadata", {}).get("RetryAttempts", 0) > 0
+        self.consume(consumed, retried=retried)
+
+    def summary(self):
+        return (f"RCU consumidas: {self.consumed:.1f}, limitaciones: {self.throttles}, "
+                f"tasa final: {self.rate:.1f}/{self.max_rate:.1f} RCU/s")
+
+
+def create_rate_limiter(dynamodb, table_name):
+    # Limitador para la tabla según su capacidad provisionada, o None si no aplica
+    if READ_CAPACITY_LIMIT > 0:
+        max_rate = READ_CAPACITY_LIMIT
+    elif READ_CAPACITY_PERCENT <= 0:
+        return None
+    else:
+        table = dynamodb.describe_table(TableName=table_name)["Table"]
+        provisioned = table.get("ProvisionedThroughput", {}).get("ReadCapacityUnits", 0)
+        if not provisioned:
+            logger.info(f"La tabla '{table_name}' es on-demand; sin límite de RCU (usar READ_CAPACITY_LIMIT para fijarlo).")
+            return None
+        max_rate = provisioned * READ_CAPACITY_PERCENT / 100
+    logger.info(f"Limitando la lectura de '{table_name}' a {max_rate:.1f} RCU/s.")
+    return AdaptiveRateLimiter(max_rate)
@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from loguru import logger
+from common.compression import prepare_upload
+from common.metrics import current
+from common.resumable import resumable_upload
+from common.watermark import STATE_DIRECTORY
+
+MB = 1024 * 1024
+
+# Subidas multipart de los load_*.py. Por encima del umbral el archivo se sube en partes
+# concurrentes; tamaño de parte y concurrencia son fijos si se indican o se ajustan solos.
+UPLOAD_MULTIPART_THRESHOLD_MB = int(os.getenv("UPLOAD_MULTIPART_THRESHOLD_MB", "16"))
+UPLOAD_PART_SIZE_MB = os.getenv("UPLOAD_PART_SIZE_MB", "auto")
+UPLOAD_CONCURRENCY = os.getenv("UPLOAD_CONCURRENCY", "auto")
+UPLOAD_MIN_CONCURRENCY = 2
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", str(min(64, (os.cpu_count() or 2) * 8))))
+
+# Límites de S3: partes de 5 MB a 5 GB y como máximo 10.000 por objeto
+S3_MIN_PART_SIZE = 5 * MB
+MAX_PART_SIZE = 5 * 1024 * MB
+# Tamaño mínimo de parte con tamaño automático: a propósito por encima del mínimo de S3
+# (el mismo valor por defecto de s3transfer), partes más chicas solo suman peticiones
+MIN_PART_SIZE = 8 * MB
+MAX_PARTS = 10000
+# Partes por hilo que se buscan con tamaño automático (reparte mejor la cola final)
+PARTS_PER_THREAD = 4
+# Mejora mínima de MB/s para seguir subiendo la concurrencia en el mismo sentido
+TUNING_TOLERANCE = 0.05
+
+
+class ConcurrencyTuner:
+    # Ajuste de la concurrencia por ascenso de colina sobre el MB/s medido: tras cada
+    # subida multipart se duplica (o se reduce a la mitad) la concurrencia mientras el
+    # caudal mejore; si empeora se invierte el sentido. El estado se guarda en
+    # state/upload_tuning.json para que la siguiente ejecución empiece donde quedó.
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(STATE_DIRECTORY, "upload_tuning.json")
+        self.concurrency = max(UPLOAD_MIN_CONCURRENCY, min(UPLOAD_MAX_CONCURRENCY, (os.cpu_count() or 2) * 2))
+        self.direction = 1
+        self.best_rate = 0.0
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as tuning_file:
+                state = json.load(tuning_file)
+            self.concurrency = max(UPLOAD_MIN_CONCURRENCY, min(UPLOAD_MAX_CONCURRENCY, state["concurrency"]))
+            self.direction = state.get("direction", 1)
+            self.best_rate = state.get("best_rate", 0.0)
+
+    def current(self):
+        if UPLOAD_CONCURRENCY != "auto":
+            return int(UPLOAD_CONCURRENCY)
+        with self._lock:
+            return self.concurrency
+
+    def record(self, concurrency, rate):
+        if UPLOAD_CONCURRENCY != "auto":
+            return
+        with self._lock:
+            if rate < self.best_rate * (1 - TUNING_TOLERANCE):
+                self.direction = -self.direction
+            # El mejor caudal decae para adaptarse a cambios de red
+            self.best_rate = max(rate, self.best_rate * 0.9)
+            step = 2 if self.direction > 0 else 0.5
+            self.concurrency = max(UPLOAD_MIN_CONCURRENCY,
+                                   min(UPLOAD_MAX_CONCURRENCY, int(round(concurrency * step))))
+            self._save()
+
+    def _save(self):
+        os.makedirs(STATE_DIRECTORY, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as tuning_file:
+            json.dump({"concurrency": self.concurrency, "direction": self.direction,
+                       "best_rate": self.best_rate}, tuning_file)
+        os.replace(tmp_path, self.path)
+
+
+_tuner = None
+_tuner_lock = threading.Lock()
+
+
+def tuner():
+    global _tuner
+    with _tuner_lock:
+        if _tuner is None:
+            _tuner = ConcurrencyTuner()
+        return _tuner
+
+
+def part_size_for(file_size, concurrency):
+    if UPLOAD_PART_SIZE_MB != "auto":
+        part_size = int(UPLOAD_PART_SIZE_MB) * MB
+    else:
+        # Al menos PARTS_PER_THREAD partes por hilo, redondeado a MB
+        part_size = max(MIN_PART_SIZE, math.ceil(file_size / (concurrency * PARTS_PER_THREAD) / MB) * MB)
+    # Nunca más de 10.000 partes
+    part_size = max(part_size, math.ceil(file_size / MAX_PARTS / MB) * MB)
+    return min(MAX_PART_SIZE, max(S3_MIN_PART_SIZE, part_size))
+
+
+def transfer_config(file_size, concurrency):
+    # s3transfer se importa solo si hay algo que subir
+    from boto3.s3.transfer import TransferConfig
+    part_size = part_size_for(file_size, concurrency)
+    # No tiene sentido más hilos que partes
+    concurrency = max(1, min(concurrency, math.ceil(file_size / part_size)))
+    return TransferConfig(multipart_threshold=UPLOAD_MULTIPART_THRESHOLD_MB * MB, multipart_chunksize=part_size,
+                          max_concurrency=concurrency, use_threads=True)
+
+
+def upload_file(s3, file_path, bucket, key, extra_args=None, slots=None):
+    # Sube el archivo con tamaño de parte y concurrencia ajustados; registra el MB/s logrado
+    # y lo usa para ajustar la concurrencia de las siguientes subidas. Con COMPRESSION se
+    # sube la versión comprimida con el sufijo y Content-Encoding correspondientes.
+    # Por encima del umbral la subida es reanudable (ver common/resumable.py).
+    # slots es un semáforo compartido por varias subidas simultáneas (load_all.py) que limita
+    # las peticiones a S3 en vuelo entre todas. Devuelve (tamaño del archivo subido, MB/s).
+    source_path = file_path
+    file_path, key, extra_args, compressed_path = prepare_upload(file_path, key, extra_args)
+    try:
+        file_size = os.path.getsize(file_path)
+        # Concurrencia aprendida por el ajuste; transfer_config la baja si el archivo tiene menos partes
+        tuned = tuner().current()
+        config = transfer_config(file_size, tuned)
+        multipart = file_size >= config.multipart_threshold
+        start = time.perf_counter()
+        if multipart:
+            parts, sent = resumable_upload(s3, file_path, bucket, key, config.multipart_chunksize,
+                                           config.max_concurrency, extra_args=extra_args, source_path=source_path,
+                                           slots=slots)
+        else:
+            with slots or nullcontext():
+                s3.upload_file(file_path, bucket, key, ExtraArgs=extra_args, Config=config)
+        elapsed = max(time.perf_counter() - start, 1e-6)
+    finally:
+        if compressed_path:
+            os.remove(compressed_path)
+    rate = file_size / MB / elapsed
+    metrics = current()
+    metrics.add("uploaded_files")
+    metrics.add("upload_seconds", elapsed)
+    if multipart:
+        logger.info(f"'{key}': {file_size / MB:.1f} MB en {elapsed:.2f} s ({rate:.1f} MB/s), {sent} de {parts} "
+                    f"partes de {config.multipart_chunksize // MB} MB con {config.max_concurrency} hilos "
+                    f"({rate / config.max_concurrency:.1f} MB/s por hilo).")
+        # Una subida reanudada, con menos hilos que los aprendidos porque el archivo tiene
+        # pocas partes o que compartió los slots con otras no mide el caudal de la
+        # concurrencia ajustada: no se usa para ajustar
+        if sent == parts and config.max_concurrency == tuned and slots is None:
+            tuner().record(tuned, rate)
+    else:
+        # Las partes de una subida multipart ya se contaron al completarse
+        metrics.add("uploaded_bytes", file_size)
+        logger.info(f"'{key}': {file_size / 1024:.1f} KB en {elapsed:.2f} s ({rate:.1f} MB/s).")
+    return file_size, rate
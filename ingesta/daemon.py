@@ -0,0 +1,168 @@
+import contextvars
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from botocore.exceptions import BotoCoreError, ClientError
+from loguru import logger
+from common.clients import aws_client
+from common.latency import script_name, write_report
+from common.logs import setup_logging
+from common.s3_stream import s3_client
+from common.streams import has_pending_changes
+from common.watermark import EXPORT_MODE
+from pipeline import PIPELINE_TABLES, RESOURCE_LIMITS, build_stages, run_stage
+
+# Configuración del logger
+LOG_FILE_PATH = "./logs/daemon.log"
+
+# Ingesta continua en un solo proceso: en lugar de reiniciar contenedores, cada tabla
+# repite su ciclo (pull y luego load) cada cierto intervalo. Las etapas corren como en
+# PIPELINE_ISOLATION=thread, así la sesión, las credenciales, los clientes de AWS y sus
+# conexiones (ya con TLS negociado) se crean una vez y cada ciclo solo paga el trabajo de datos.
+REGION = "us-east-1"
+DAEMON_INTERVAL_SECONDS = float(os.getenv("DAEMON_INTERVAL_SECONDS", "900"))
+# Intervalo propio de algunas tablas: "pf_ordenes=60,pf_pagos=300"
+DAEMON_INTERVALS = {table.strip(): float(seconds) for table, seconds in
+                    (entry.split("=") for entry in os.getenv("DAEMON_INTERVALS", "").split(",") if "=" in entry)}
+# Variación aleatoria de cada intervalo (fracción): las tablas no se disparan todas a la vez
+DAEMON_JITTER = float(os.getenv("DAEMON_JITTER", "0.1"))
+# Con EXPORT_MODE=cdc se sondea el stream de cada tabla cada tantos segundos (0 lo
+# desactiva) y una tabla con cambios se adelanta, respetando un mínimo entre ciclos
+DAEMON_CHANGE_POLL_SECONDS = float(os.getenv("DAEMON_CHANGE_POLL_SECONDS", "60"))
+DAEMON_MIN_GAP_SECONDS = float(os.getenv("DAEMON_MIN_GAP_SECONDS", "30"))
+
+# Etapas simultáneas por recurso, compartidas por todas las tablas
+SEMAPHORES = {resource: threading.BoundedSemaphore(max(1, limit)) for resource, limit in RESOURCE_LIMITS.items()}
+
+
+def jittered(seconds):
+    return max(0.0, seconds * random.uniform(1 - DAEMON_JITTER, 1 + DAEMON_JITTER))
+
+
+def warm_up():
+    # Crea los clientes que usarán las etapas (mismos parámetros, mismo caché) antes del primer ciclo
+    aws_client("dynamodb", 10, region_name=REGION)
+    s3_client()
+    if EXPORT_MODE == "cdc":
+        aws_client("dynamodbstreams", region_name=REGION)
+
+
+def run_cycle(table, args):
+    # pull y load de la tabla, cada etapa con su reintento y dentro del límite de su recurso
+    stages = build_stages([table])
+    start = time.perf_counter()
+    for name in (f"pull:{table}", f"load:{table}"):
+        stage = stages[name]
+        with SEMAPHORES[stage["resource"]]:
+            run_stage(name, stage, args if stage["resource"] == "dynamodb" else [], isolation="thread")
+    return time.perf_counter() - start
+
+
+def changed(table, entry):
+    # True si el stream de la tabla tiene cambios sin exportar; una tabla sin stream deja de sondearse
+    try:
+        return has_pending_changes(aws_client("dynamodb", 10, region_name=REGION),
+                                   aws_client("dynamodbstreams", region_name=REGION), table)
+    except RuntimeError as e:
+        logger.info(f"{str(e)} Solo se ejecutará por intervalo.")
+        entry["probe"] = False
+    except (ClientError, BotoCoreError) as e:
+        if isinstance(e, ClientError) and e.response["Error"]["Code"] == "ResourceNotFoundException":
+            entry["probe"] = False
+        logger.warning(f"No se pudo sondear el stream de '{table}': {str(e)}")
+    return False
+
+
+def run_daemon(tables, args, stop):
+    now = time.monotonic()
+    schedule = {}
+    for table in tables:
+        interval = DAEMON_INTERVALS.get(table, DAEMON_INTERVAL_SECONDS)
+        # El primer ciclo de cada tabla se reparte dentro del margen de jitter de su intervalo
+        schedule[table] = {"interval": interval, "next": now + random.uniform(0, interval * DAEMON_JITTER),
+                           "last_end": None, "reason": "inicio", "cycles": 0,
+                           "probe": EXPORT_MODE == "cdc" and DAEMON_CHANGE_POLL_SECONDS > 0}
+    next_probe = now + DAEMON_CHANGE_POLL_SECONDS
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(tables))) as pool:
+        while not stop.is_set():
+            now = time.monotonic()
+            for future in [future for future in running if future.done()]:
+                table = running.pop(future)
+                entry = schedule[table]
+                entry["last_end"] = now
+                entry["next"] = now + jittered(entry["interval"])
+                try:
+                    duration = future.result()
+                    entry["cycles"] += 1
+                    logger.success(f"Ciclo {entry['cycles']} de '{table}' completado en {duration:.1f} s; "
+                                   f"próximo en {entry['next'] - now:.0f} s.")
+                except Exception as e:
+                    logger.error(f"Ciclo de '{table}' fallido: {str(e)}. Próximo intento en {entry['next'] - now:.0f} s.")
+                # El proceso no termina: la latencia acumulada se publica tras cada ciclo
+                try:
+                    write_report(script_name())
+                except OSError as e:
+                    logger.warning(f"No se pudo escribir el reporte de latencia: {str(e)}")
+
+            if now >= next_probe:
+                next_probe = now + DAEMON_CHANGE_POLL_SECONDS
+                for table, entry in schedule.items():
+                    if (not entry["probe"] or table in running.values() or entry["next"] <= now
+                            or (entry["last_end"] is not None and now - entry["last_end"] < DAEMON_MIN_GAP_SECONDS)):
+                        continue
+                    if changed(table, entry):
+                        entry["next"] = now
+                        entry["reason"] = "cambios"
+
+            for table, entry in schedule.items():
+                if table in running.values() or entry["next"] > now:
+                    continue
+                logger.info(f"Ciclo de '{table}' iniciado (motivo: {entry['reason']}).")
+                entry["reason"] = "intervalo"
+                # El hilo hereda la marca de log del daemon
+                running[pool.submit(contextvars.copy_context().run, run_cycle, table, args)] = table
+
+            # Se duerme hasta el próximo ciclo, sondeo o fin de ciclo (como mucho 1 s para atender la señal)
+            idle = [entry["next"] for table, entry in schedule.items() if table not in running.values()]
+            timeout = min([next_probe] + idle) - time.monotonic()
+            timeout = min(1.0, max(0.05, timeout))
+            if running:
+                wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                stop.wait(timeout)
+        if running:
+            logger.info(f"Esperando a que terminen {len(running)} ciclos en curso...")
+
+
+def main(argv=None):
+    # Los argumentos (--tenants, --since, --columns...) se pasan a las extracciones de cada ciclo
+    setup_logging(LOG_FILE_PATH)
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Señal {signum} recibida; el daemon se detiene al terminar los ciclos en curso.")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    with logger.contextualize(log_file=LOG_FILE_PATH):
+        intervals = {table: DAEMON_INTERVALS.get(table, DAEMON_INTERVAL_SECONDS) for table in PIPELINE_TABLES}
+        probing = EXPORT_MODE == "cdc" and DAEMON_CHANGE_POLL_SECONDS > 0
+        logger.info(f"Iniciando daemon de ingesta para {len(PIPELINE_TABLES)} tablas. Intervalos (s): {intervals}, "
+                    f"jitter {DAEMON_JITTER:.0%}, detección de cambios: "
+                    f"{f'cada {DAEMON_CHANGE_POLL_SECONDS:.0f} s' if probing else 'no'}.")
+        build_stages(PIPELINE_TABLES)
+        warm_up()
+        run_daemon(PIPELINE_TABLES, sys.argv[1:] if argv is None else argv, stop)
+        logger.info("Daemon detenido.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,119 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from loguru import logger
+from datetime import datetime
+from common.budget import TOTAL_READ_CAPACITY, CapacityBudget, table_size
+from common.clients import aws_client
+from common.export import export_table
+from common.logs import setup_logging
+from common.metrics import stage_metrics
+from common.projection import resolve_columns, unknown_columns
+from common.query import resolve_query
+from common.tables import TABLES
+from common.throttle import create_rate_limiter
+
+# Configuración de logger
+LOG_FILE_PATH = "./logs/export_all.log"
+
+# Configuración global
+REGION = "us-east-1"
+OUTPUT_DIR = "./exported_data"
+
+# Tablas a exportar (por defecto todas las configuradas en common/tables.py)
+EXPORT_TABLES = [table.strip() for table in os.getenv("EXPORT_TABLES", ",".join(TABLES)).split(",") if table.strip()]
+# Segmentos por tabla si la tabla no define los suyos
+SCAN_SEGMENTS = int(os.getenv("SCAN_SEGMENTS", "1"))
+
+
+def table_segments(table_name):
+    return TABLES.get(table_name, {}).get("segments", SCAN_SEGMENTS)
+
+
+def resolve_options(argv):
+    # Columnas y consulta de cada tabla, resueltas antes de leer nada: --columns, --since... se
+    # aplican a todas las tablas, así que una columna que alguna no tiene (quedaría vacía) o un
+    # rango de fechas sobre una tabla sin "partition_date" detiene la exportación de entrada.
+    # Para exportar solo algunas tablas con esas opciones, EXPORT_TABLES.
+    options = {}
+    errors = []
+    for table_name in EXPORT_TABLES:
+        columns = resolve_columns(table_name, argv)
+        missing = unknown_columns(table_name, columns)
+        if missing:
+            errors.append(f"La tabla '{table_name}' no tiene las columnas: {', '.join(missing)}.")
+        try:
+            options[table_name] = (columns, resolve_query(table_name, argv))
+        except ValueError as e:
+            errors.append(str(e))
+    return options, errors
+
+
+def export_one(dynamodb, table_name, rate_limiter, budget, columns, query):
+    start_time = datetime.now()
+    config = TABLES.get(table_name, {})
+    try:
+        # Cada tabla corre en su hilo con sus propias métricas de etapa
+        with stage_metrics("pull", table_name) as metrics:
+            csv_file_path, total = export_table(dynamodb, table_name, OUTPUT_DIR,
+                                                delimiter=config.get("delimiter", ";"),
+                                                total_segments=table_segments(table_name), rate_limiter=rate_limiter,
+                                                columns=columns, query=query)
+            metrics.done(True)
+        logger.success(f"'{table_name}': {total} registros exportados a '{csv_file_path}' en {datetime.now() - start_time}.")
+        return total
+    finally:
+        if budget is not None:
+            budget.release(table_name)
+
+
+def export_all_tables(argv=None):
+    logger.info(f"Iniciando exportación de {len(EXPORT_TABLES)} tablas: {', '.join(EXPORT_TABLES)}.")
+    start_time = datetime.now()
+    options, errors = resolve_options(argv)
+    if errors:
+        for error in errors:
+            logger.error(error)
+        logger.critical("Opciones de exportación no válidas para todas las tablas; use EXPORT_TABLES para acotarlas.")
+        return False
+
+    # Un único cliente y pool de conexiones para todos los segmentos de todas las tablas
+    connections = sum(table_segments(table) for table in EXPORT_TABLES) + len(EXPORT_TABLES)
+    dynamodb = aws_client("dynamodb", max(10, connections), region_name=REGION)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Presupuesto de lectura compartido, repartido según el tamaño de cada tabla
+    budget = None
+    if TOTAL_READ_CAPACITY > 0:
+        budget = CapacityBudget(TOTAL_READ_CAPACITY)
+        limiters = budget.allocate({table: table_size(dynamodb, table) for table in EXPORT_TABLES})
+    else:
+        limiters = {table: create_rate_limiter(dynamodb, table) for table in EXPORT_TABLES}
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(EXPORT_TABLES)) as pool:
+        futures = {pool.submit(export_one, dynamodb, table, limiters[table], budget, *options[table]): table for table in EXPORT_TABLES}
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(table)
+                logger.error(f"Error durante la exportación de '{table}': {str(e)}")
+
+    end_time = datetime.now()
+    if failed:
+        logger.warning(f"Exportación finalizada con errores en: {', '.join(failed)}. Tiempo total: {end_time - start_time}")
+    else:
+        logger.success(f"Exportación de todas las tablas completada. Tiempo total: {end_time - start_time}")
+    return not failed
+
+
+def main(argv=None):
+    setup_logging(LOG_FILE_PATH)
+    return export_all_tables(sys.argv[1:] if argv is None else argv)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
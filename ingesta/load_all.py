@@ -0,0 +1,133 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from loguru import logger
+from datetime import datetime
+from common.clients import aws_client
+from common.load import find_output_files
+from common.logs import setup_logging
+from common.manifest import UploadManifest
+from common.metrics import current, stage_metrics
+from common.s3_stream import S3_BUCKET, S3_ENDPOINT_URL
+from common.tables import TABLES
+from common.transfer import MB, upload_file
+
+# Configuración del logger
+LOG_FILE_PATH = "./logs/load_all.log"
+
+# Variables globales
+BASE_DIRECTORY = "./exported_data"
+BUCKET_NAME = S3_BUCKET
+# Peticiones a S3 simultáneas entre todos los archivos (partes incluidas)
+LOAD_CONCURRENCY = int(os.getenv("LOAD_CONCURRENCY", str(min(64, (os.cpu_count() or 2) * 8))))
+# Hilos para calcular los hashes del manifiesto
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "4"))
+
+
+def discover_files(base_directory):
+    # (tabla, ruta local, clave S3, es_delta) para el CSV plano, deltas, cambios,
+    # consultas y particiones de cada tabla configurada
+    files = []
+    for table_name, config in TABLES.items():
+        prefix = config.get("s3_prefix", table_name)
+        file_path = os.path.join(base_directory, f"{table_name}.csv")
+        if os.path.isfile(file_path):
+            files.append((table_name, file_path, f"{prefix}/{table_name}.csv", False))
+        for local_path, key, is_delta in find_output_files(base_directory, table_name):
+            files.append((table_name, local_path, key, is_delta))
+    return files
+
+
+def ingest_all():
+    logger.info(f"Iniciando ingesta de todas las tablas al bucket '{BUCKET_NAME}'.")
+    start_time = datetime.now()
+    # Conexión a S3 compartida por todas las subidas, con un pool para LOAD_CONCURRENCY peticiones
+    s3 = aws_client("s3", max(10, LOAD_CONCURRENCY), endpoint_url=S3_ENDPOINT_URL)
+    try:
+        s3.head_bucket(Bucket=BUCKET_NAME)
+    except ClientError as e:
+        logger.critical(f"El bucket '{BUCKET_NAME}' no está disponible: {str(e)}. Abortando ingesta.")
+        return False
+    if not os.path.exists(BASE_DIRECTORY):
+        logger.error(f"El directorio '{BASE_DIRECTORY}' no existe. Abortando ingesta.")
+        return False
+
+    files = discover_files(BASE_DIRECTORY)
+    if not files:
+        logger.warning(f"No hay archivos para subir en '{BASE_DIRECTORY}'.")
+        return True
+    manifests = {table_name: UploadManifest.load(s3, BUCKET_NAME, TABLES[table_name].get("s3_prefix", table_name),
+                                                 table_name)
+                 for table_name in {table_name for table_name, _, _, _ in files}}
+
+    # Solo se suben los archivos cuyo hash cambió (los deltas siempre)
+    def needs_upload(entry):
+        table_name, local_path, key, is_delta = entry
+        return is_delta or manifests[table_name].changed(local_path, key)
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        pending = [entry for entry, changed in zip(files, pool.map(needs_upload, files)) if changed]
+    skipped = len(files) - len(pending)
+    logger.info(f"{len(files)} archivos encontrados: {len(pending)} por subir, {skipped} sin cambios.")
+
+    # Cada archivo pasa por common/transfer.upload_file (compresión, partes y concurrencia
+    # ajustadas, subida reanudable); un semáforo de LOAD_CONCURRENCY slots limita las
+    # peticiones en vuelo entre todos. Los más grandes empiezan primero porque marcan la duración.
+    slots = threading.BoundedSemaphore(LOAD_CONCURRENCY)
+    pending.sort(key=lambda entry: os.path.getsize(entry[1]), reverse=True)
+
+    def upload(entry):
+        _, local_path, key, _ = entry
+        return upload_file(s3, local_path, BUCKET_NAME, key, slots=slots)
+
+    uploaded_bytes = 0
+    failed = 0
+    metrics = current()
+    upload_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(LOAD_CONCURRENCY, len(pending)))) as pool:
+        # Cada hilo hereda el contexto: las subidas cuentan en las métricas de esta etapa
+        futures = [(entry, pool.submit(contextvars.copy_context().run, upload, entry)) for entry in pending]
+        # Archivos en cola o subiéndose
+        metrics.watch("uploads", lambda: sum(not future.done() for _, future in futures))
+        for (table_name, local_path, key, is_delta), future in futures:
+            try:
+                size, _ = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error al subir '{local_path}' a '{key}': {str(e)}")
+                continue
+            uploaded_bytes += size
+            if is_delta:
+                os.remove(local_path)
+            else:
+                manifests[table_name].uploaded(key)
+    upload_elapsed = max(time.perf_counter() - upload_start, 1e-6)
+    metrics.unwatch("uploads")
+
+    for manifest in manifests.values():
+        manifest.save()
+
+    end_time = datetime.now()
+    summary = (f"Tiempo total: {end_time - start_time}. Subidos: {len(pending) - failed}, sin cambios: {skipped}. "
+               f"{uploaded_bytes / MB:.1f} MB a {uploaded_bytes / MB / upload_elapsed:.1f} MB/s "
+               f"con {LOAD_CONCURRENCY} hilos.")
+    if failed:
+        # Código de salida 1: el pipeline reintenta la etapa
+        logger.error(f"Ingesta incompleta: {failed} archivos no se pudieron subir. {summary}")
+    else:
+        logger.success(f"Ingesta completada. {summary}")
+    return failed == 0
+
+
+def main(argv=None):
+    setup_logging(LOG_FILE_PATH)
+    with stage_metrics("load", "all") as metrics:
+        return metrics.done(ingest_all())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,291 @@
+import argparse
+import contextvars
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from loguru import logger
+from common.logs import setup_logging
+from common.watermark import STATE_DIRECTORY
+
+# Configuración del logger
+LOG_FILE_PATH = "./logs/pipeline.log"
+
+# Pipeline completo de ingesta como grafo de etapas (DAG): cada tabla tiene una etapa de
+# extracción (pull, lee DynamoDB) y otra de carga (load, sube a S3) que depende de la
+# primera. Las etapas listas se lanzan en paralelo hasta el límite de cada recurso, una
+# etapa fallida se reintenta sola y al final se informa la ruta crítica.
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+STAGE_LOG_DIRECTORY = "./logs/pipeline"
+PIPELINE_STATE_PATH = os.path.join(STATE_DIRECTORY, "pipeline.json")
+
+# Scripts de extracción y carga de cada tabla
+TABLE_SCRIPTS = {
+    "pf_usuarios": ("t_usuarios/pull_usuarios.py", "t_usuarios/load_usuarios.py"),
+    "pf_productos": ("t_productos/pull_productos.py", "t_productos/load_productos.py"),
+    "pf_ordenes": ("t_ordenes/pull_ordenes.py", "t_ordenes/load_ordenes.py"),
+    "pf_pagos": ("t_pagos/pull_pagos.py", "t_pagos/load_pagos.py"),
+    "pf_comentario": ("t_comentarios/pull_comments.py", "t_comentarios/load_comments.py"),
+    "pf_inventarios": ("t_inventarios/pull_inventarios.py", "t_inventarios/load_inventarios.py"),
+    "pf_inventarioprod": ("t_inventarioprod/pull_inventarioprod.py", "t_inventarioprod/load_inventarioprod.py"),
+}
+PIPELINE_TABLES = [table.strip() for table in os.getenv("PIPELINE_TABLES", ",".join(TABLE_SCRIPTS)).split(",")
+                   if table.strip()]
+
+# Etapas simultáneas por recurso: las extracciones tienen cada una su propia capacidad de
+# lectura en DynamoDB; las cargas comparten el ancho de banda hacia S3
+RESOURCE_LIMITS = {
+    "dynamodb": int(os.getenv("PIPELINE_PULL_CONCURRENCY", str(len(TABLE_SCRIPTS)))),
+    "s3": int(os.getenv("PIPELINE_LOAD_CONCURRENCY", "3")),
+}
+# Reintentos de una etapa fallida (solo esa etapa) y espera base entre intentos
+PIPELINE_RETRIES = int(os.getenv("PIPELINE_RETRIES", "2"))
+PIPELINE_RETRY_SECONDS = float(os.getenv("PIPELINE_RETRY_SECONDS", "5"))
+# "process": cada etapa en su propio intérprete (aislado, usa todos los núcleos).
+# "thread": las etapas se importan y corren en este proceso, sin pagar en cada una el
+# arranque de Python, boto3 y la sesión; conviene para tablas pequeñas, donde el arranque
+# domina, aunque las etapas comparten el GIL.
+PIPELINE_ISOLATION = os.getenv("PIPELINE_ISOLATION", "process")
+
+
+def build_stages(tables):
+    # nombre -> {script, recurso, dependencias}
+    stages = {}
+    for table in tables:
+        if table not in TABLE_SCRIPTS:
+            raise ValueError(f"Tabla sin scripts de pipeline: {table}")
+        pull_script, load_script = TABLE_SCRIPTS[table]
+        stages[f"pull:{table}"] = {"script": pull_script, "resource": "dynamodb", "after": []}
+        stages[f"load:{table}"] = {"script": load_script, "resource": "s3", "after": [f"pull:{table}"]}
+    return stages
+
+
+def topological_order(stages):
+    # Orden de Kahn; falla si hay ciclos o dependencias que no existen
+    pending = {name: len(stage["after"]) for name, stage in stages.items()}
+    dependents = {name: [] for name in stages}
+    for name, stage in stages.items():
+        for dependency in stage["after"]:
+            if dependency not in stages:
+                raise ValueError(f"La etapa '{name}' depende de '{dependency}', que no existe.")
+            dependents[dependency].append(name)
+    ready = deque(name for name, count in pending.items() if count == 0)
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for dependent in dependents[name]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+    if len(order) != len(stages):
+        raise ValueError("El pipeline tiene dependencias circulares.")
+    return order, dependents
+
+
+def load_state():
+    if os.path.exists(PIPELINE_STATE_PATH):
+        with open(PIPELINE_STATE_PATH, encoding="utf-8") as state_file:
+            return json.load(state_file)
+    return {"stages": {}}
+
+
+def save_state(state):
+    os.makedirs(STATE_DIRECTORY, exist_ok=True)
+    tmp_path = f"{PIPELINE_STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(tmp_path, PIPELINE_STATE_PATH)
+
+
+def priorities(stages, order, dependents, previous):
+    # Longitud esperada del camino más largo que empieza en cada etapa (con las duraciones de
+    # la ejecución anterior): si un recurso está lleno se lanza antes la que más retrasaría el final
+    priority = {}
+    for name in reversed(order):
+        duration = previous.get(name, {}).get("duration", 1.0)
+        priority[name] = duration + max((priority[dependent] for dependent in dependents[name]), default=0.0)
+    return priority
+
+
+def run_in_process(name, stage, args, attempt):
+    # El script corre en su propio intérprete; su salida va a logs/pipeline/<etapa>.log.
+    # Devuelve (código de salida, últimas líneas de la salida de este intento)
+    script = os.path.join(ROOT_DIRECTORY, stage["script"])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIRECTORY, os.getenv("PYTHONPATH")])))
+    os.makedirs(STAGE_LOG_DIRECTORY, exist_ok=True)
+    log_path = os.path.join(STAGE_LOG_DIRECTORY, f"{name.replace(':', '_')}.log")
+    with open(log_path, "a", encoding="utf-8") as stage_log:
+        stage_log.write(f"--- {datetime.now().isoformat(timespec='seconds')} intento {attempt}\n")
+        stage_log.flush()
+        offset = stage_log.tell()
+        result = subprocess.run([sys.executable, script, *args], stdout=stage_log, stderr=subprocess.STDOUT, env=env)
+    with open(log_path, encoding="utf-8", errors="replace") as stage_log:
+        stage_log.seek(offset)
+        tail = " | ".join(line.strip() for line in deque(stage_log, maxlen=3))
+    return result.returncode, tail
+
+
+def run_in_thread(stage, args):
+    # El módulo del script se importa una vez y su main() corre en este hilo, con los
+    # clientes de AWS ya creados por las etapas anteriores
+    module = importlib.import_module(stage["script"][:-len(".py")].replace("/", "."))
+    with logger.contextualize(log_file=module.LOG_FILE_PATH):
+        try:
+            return (0 if module.main(list(args)) else 1), f"ver {module.LOG_FILE_PATH}"
+        except Exception as e:
+            return 1, str(e)
+
+
+def run_stage(name, stage, args, isolation=None):
+    # Ejecuta la etapa según PIPELINE_ISOLATION (o isolation); reintenta solo esta etapa
+    for attempt in range(1, PIPELINE_RETRIES + 2):
+        if (isolation or PIPELINE_ISOLATION) == "thread":
+            returncode, tail = run_in_thread(stage, args)
+        else:
+            returncode, tail = run_in_process(name, stage, args, attempt)
+        if returncode == 0:
+            return attempt
+        if attempt > PIPELINE_RETRIES:
+            raise RuntimeError(f"código de salida {returncode} tras {attempt} intentos: {tail}")
+        delay = PIPELINE_RETRY_SECONDS * 2 ** (attempt - 1)
+        logger.warning(f"Etapa '{name}' falló (código {returncode}, intento {attempt}). "
+                       f"Reintentando en {delay:.1f} s. Última salida: {tail}")
+        time.sleep(delay)
+
+
+def critical_path(stages, timings):
+    # Desde la etapa que terminó última se retrocede por la dependencia que terminó más tarde:
+    # esa cadena es la que fijó la duración total
+    finished = [name for name in timings if "end" in timings[name]]
+    if not finished:
+        return []
+    path = [max(finished, key=lambda name: timings[name]["end"])]
+    while True:
+        dependencies = [dependency for dependency in stages[path[-1]]["after"] if "end" in timings.get(dependency, {})]
+        if not dependencies:
+            return list(reversed(path))
+        path.append(max(dependencies, key=lambda name: timings[name]["end"]))
+
+
+def run_pipeline(stages, args, skip=()):
+    order, dependents = topological_order(stages)
+    previous = load_state().get("stages", {})
+    priority = priorities(stages, order, dependents, previous)
+    status = {name: "ok" for name in skip}
+    timings = {}
+    attempts = {}
+    pending = set(stages) - set(skip)
+    in_use = {resource: 0 for resource in RESOURCE_LIMITS}
+    running = {}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, len(stages))) as pool:
+        while pending or running:
+            # Las etapas cuyas dependencias fallaron no se ejecutan
+            for name in sorted(pending):
+                if any(status.get(dependency) in ("failed", "skipped") for dependency in stages[name]["after"]):
+                    status[name] = "skipped"
+                    pending.discard(name)
+                    logger.warning(f"Etapa '{name}' omitida: falló una de sus dependencias.")
+            ready = [name for name in pending if all(status.get(dependency) == "ok"
+                                                     for dependency in stages[name]["after"])]
+            now = time.perf_counter() - start
+            for name in sorted(ready, key=lambda name: -priority[name]):
+                timings.setdefault(name, {"ready": now})
+                resource = stages[name]["resource"]
+                if in_use[resource] >= RESOURCE_LIMITS[resource]:
+                    continue
+                in_use[resource] += 1
+                pending.discard(name)
+                timings[name]["start"] = now
+                logger.info(f"Etapa '{name}' iniciada ({stages[name]['script']}).")
+                stage_args = args if resource == "dynamodb" else []
+                # El hilo hereda el contexto (la marca de log del pipeline)
+                running[pool.submit(contextvars.copy_context().run, run_stage, name, stages[name],
+                                    stage_args)] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                in_use[stages[name]["resource"]] -= 1
+                timings[name]["end"] = time.perf_counter() - start
+                duration = timings[name]["end"] - timings[name]["start"]
+                try:
+                    attempts[name] = future.result()
+                    status[name] = "ok"
+                    logger.success(f"Etapa '{name}' completada en {duration:.1f} s.")
+                except Exception as e:
+                    status[name] = "failed"
+                    logger.error(f"Etapa '{name}' fallida: {str(e)}")
+    total = time.perf_counter() - start
+
+    state = {"finished_at": datetime.now().isoformat(timespec="seconds"), "duration": round(total, 3), "stages": {}}
+    for name in stages:
+        entry = {"status": status.get(name, "skipped")}
+        if name in timings and "end" in timings[name]:
+            entry["duration"] = round(timings[name]["end"] - timings[name]["start"], 3)
+            entry["attempts"] = attempts.get(name, PIPELINE_RETRIES + 1)
+        elif name in previous and name in skip:
+            entry = previous[name]
+        state["stages"][name] = entry
+    save_state(state)
+    return status, timings, total
+
+
+def report(stages, status, timings, total):
+    path = critical_path(stages, timings)
+    if path:
+        steps = []
+        for name in path:
+            timing = timings[name]
+            step = f"{name} {timing['end'] - timing['start']:.1f} s"
+            # Tiempo que la etapa estuvo lista pero esperando un hueco de su recurso
+            if timing["start"] - timing["ready"] > 0.05:
+                step += f" (esperó {timing['start'] - timing['ready']:.1f} s por {stages[name]['resource']})"
+            steps.append(step)
+        logger.info(f"Ruta crítica ({timings[path[-1]]['end']:.1f} s de {total:.1f} s): {' -> '.join(steps)}.")
+    counts = {value: list(status.values()).count(value) for value in ("ok", "failed", "skipped")}
+    logger.info(f"Etapas: {counts['ok']} completadas, {counts['failed']} fallidas, {counts['skipped']} omitidas.")
+
+
+def run_all(argv=None):
+    # --resume repite solo las etapas que no terminaron bien en la última ejecución; el
+    # resto de argumentos (--tenants, --since, --columns...) se pasan a las extracciones
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--resume", action="store_true")
+    options, args = parser.parse_known_args(argv)
+    stages = build_stages(PIPELINE_TABLES)
+    skip = []
+    if options.resume:
+        previous = load_state().get("stages", {})
+        skip = [name for name in stages if previous.get(name, {}).get("status") == "ok"]
+        logger.info(f"Reanudando pipeline: {len(skip)} etapas ya completadas se omiten.")
+
+    logger.info(f"Iniciando pipeline de {len(PIPELINE_TABLES)} tablas ({len(stages) - len(skip)} etapas, "
+                f"modo {PIPELINE_ISOLATION}). Límites: {RESOURCE_LIMITS}.")
+    start_time = datetime.now()
+    status, timings, total = run_pipeline(stages, args, skip)
+    report(stages, status, timings, total)
+    end_time = datetime.now()
+    if any(value != "ok" for value in status.values()):
+        logger.error(f"Pipeline terminado con errores. Tiempo total: {end_time - start_time}.")
+        return False
+    logger.success(f"Pipeline completado. Tiempo total: {end_time - start_time}.")
+    return True
+
+
+def main(argv=None):
+    setup_logging(LOG_FILE_PATH)
+    with logger.contextualize(log_file=LOG_FILE_PATH):
+        return run_all(sys.argv[1:] if argv is None else argv)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,43 @@
+import os
+import sys
+import boto3
+import pytest
+
+# Las pruebas importan el paquete common como los scripts (desde el directorio ingesta/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# La configuración se lee al importar common: credenciales falsas para moto y sin
+# archivos de métricas ni reportes de latencia
+os.environ.update(AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing", AWS_DEFAULT_REGION="us-east-1",
+                  METRICS_FORMAT="none", LATENCY_HISTOGRAMS="0")
+os.environ.pop("S3_ENDPOINT_URL", None)
+
+moto = pytest.importorskip("moto")
+
+REGION = "us-east-1"
+BUCKET = "aproyecto-dev"
+
+
+@pytest.fixture
+def aws(tmp_path, monkeypatch):
+    # Todo lo de AWS contra moto; el estado local (puntos de control, marcas...) en tmp_path
+    monkeypatch.chdir(tmp_path)
+    with moto.mock_aws():
+        yield
+
+
+@pytest.fixture
+def s3(aws):
+    client = boto3.client("s3", region_name=REGION)
+    client.create_bucket(Bucket=BUCKET)
+    return client
+
+
+@pytest.fixture
+def dynamodb(aws):
+    return boto3.client("dynamodb", region_name=REGION)
+
+
+@pytest.fixture
+def streams(aws):
+    return boto3.client("dynamodbstreams", region_name=REGION)
@@ -0,0 +1,66 @@
+import gzip
+import os
+import pytest
+from common import compression
+from common.compression import BlockCompressor, compress_file, prepare_upload
+
+
+def content(size):
+    # Filas CSV repetitivas, como las de una exportación
+    return b"".join(f"wong;order_{number};PENDING;{number * 7 % 1000}\n".encode() for number in range(size))
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_blocks_concatenate_to_the_original(codec, tmp_path):
+    if codec == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+    data = content(20000)
+    source = tmp_path / "pf_ordenes.csv"
+    source.write_bytes(data)
+    compressor = BlockCompressor(codec, block_size=64 * 1024, workers=4)
+    with open(source, "rb") as reader:
+        blocks = []
+        while chunk := reader.read(10000):
+            blocks += compressor.feed(chunk)
+    blocks += compressor.finish()
+
+    # Varios bloques independientes, en orden, que se leen como un solo flujo
+    assert len(blocks) == -(-len(data) // (64 * 1024))
+    stream = b"".join(blocks)
+    if codec == "gzip":
+        assert gzip.decompress(stream) == data
+    else:
+        # Un frame por bloque, cada uno con su tamaño original en la cabecera
+        decompressor = zstandard.ZstdDecompressor()
+        assert b"".join(decompressor.decompress(block) for block in blocks) == data
+    assert compressor.raw_bytes == len(data)
+    assert compressor.compressed_bytes == len(stream)
+
+
+def test_gzip_output_is_deterministic_and_empty_is_valid(tmp_path):
+    source = tmp_path / "pf_ordenes.csv"
+    source.write_bytes(content(5000))
+    compress_file(str(source), str(tmp_path / "a.gz"), "gzip")
+    compress_file(str(source), str(tmp_path / "b.gz"), "gzip")
+    assert (tmp_path / "a.gz").read_bytes() == (tmp_path / "b.gz").read_bytes()
+
+    empty = tmp_path / "empty.csv"
+    empty.write_bytes(b"")
+    compress_file(str(empty), str(tmp_path / "empty.csv.gz"), "gzip")
+    assert gzip.decompress((tmp_path / "empty.csv.gz").read_bytes()) == b""
+
+
+def test_prepare_upload_adds_suffix_and_encoding(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION", "gzip")
+    source = tmp_path / "pf_ordenes.csv"
+    source.write_bytes(content(1000))
+    upload_path, key, extra_args, temporary = prepare_upload(str(source), "ordenes/pf_ordenes.csv",
+                                                             {"ContentType": "text/csv"})
+    assert key == "ordenes/pf_ordenes.csv.gz"
+    assert extra_args == {"ContentType": "text/csv", "ContentEncoding": "gzip"}
+    assert upload_path == temporary and os.path.exists(temporary)
+    with open(upload_path, "rb") as compressed:
+        assert gzip.decompress(compressed.read()) == content(1000)
+
+    monkeypatch.setattr(compression, "COMPRESSION", "none")
+    assert prepare_upload(str(source), "ordenes/pf_ordenes.csv") == (str(source), "ordenes/pf_ordenes.csv", {}, None)
@@ -0,0 +1,105 @@
+import csv
+import glob
+import os
+from datetime import datetime, timedelta
+import boto3
+import pytest
+from common import checkpoint, export, watermark
+from common.export import export_table
+from common.watermark import load_state
+from conftest import REGION
+
+TABLE = "pf_ordenes"
+
+
+@pytest.fixture
+def table(dynamodb):
+    dynamodb.create_table(TableName=TABLE,
+                          KeySchema=[{"AttributeName": "tenant_id", "KeyType": "HASH"},
+                                     {"AttributeName": "order_id", "KeyType": "RANGE"}],
+                          AttributeDefinitions=[{"AttributeName": "tenant_id", "AttributeType": "S"},
+                                                {"AttributeName": "order_id", "AttributeType": "S"}],
+                          BillingMode="PAY_PER_REQUEST")
+    return boto3.resource("dynamodb", region_name=REGION).Table(TABLE)
+
+
+@pytest.fixture
+def incremental(monkeypatch):
+    monkeypatch.setattr(watermark, "EXPORT_MODE", "incremental")
+    monkeypatch.setattr(export, "EXPORT_MODE", "incremental")
+
+
+def put_order(table, order_id, last_modified, status="PENDING"):
+    table.put_item(Item={"tenant_id": "wong", "order_id": order_id, "order_status": status,
+                         "last_modified": last_modified.isoformat()})
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as source:
+        return list(csv.DictReader(source, delimiter=";"))
+
+
+def test_incremental_exports_each_change_once(table, dynamodb, incremental, tmp_path):
+    now = datetime.now()
+    for number in range(3):
+        put_order(table, f"o{number}", now)
+
+    # Sin marca previa: exportación completa que fija la marca y las claves de la ventana
+    output, total = export_table(dynamodb, TABLE, str(tmp_path))
+    assert output.endswith(f"{TABLE}.csv") and total == 3
+    assert load_state(TABLE)["watermark"] == now.isoformat()
+
+    # Se actualiza una fila: el delta tiene solo esa, aunque las otras dos caen en la ventana de solape
+    put_order(table, "o1", now + timedelta(seconds=1), status="APPROVED PAYMENT")
+    output, total = export_table(dynamodb, TABLE, str(tmp_path))
+    rows = read_rows(output)
+    assert ".delta." in output
+    assert total == 1
+    assert [(row["order_id"], row["order_status"]) for row in rows] == [("o1", "APPROVED PAYMENT")]
+
+    # Una escritura que llega con marca anterior a la máxima (dentro del solape) no se pierde
+    os.remove(output)
+    put_order(table, "o9", now - timedelta(seconds=30))
+    output, total = export_table(dynamodb, TABLE, str(tmp_path))
+    assert [row["order_id"] for row in read_rows(output)] == ["o9"]
+
+    # Sin cambios: nada que exportar
+    os.remove(output)
+    output, total = export_table(dynamodb, TABLE, str(tmp_path))
+    assert total == 0
+
+
+def test_interrupted_scan_resumes_from_checkpoint(table, dynamodb, tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_INTERVAL_SECONDS", 0)
+    now = datetime.now()
+    for number in range(5):
+        put_order(table, f"o{number}", now)
+
+    requests = []
+    scan = dynamodb.scan
+
+    def paged_scan(**kwargs):
+        # Páginas de 2 elementos; la tercera petición de la primera ejecución falla
+        requests.append(kwargs)
+        if len(requests) == 3 and fail:
+            raise ConnectionError("conexión perdida")
+        return scan(**dict(kwargs, Limit=2))
+
+    monkeypatch.setattr(dynamodb, "scan", paged_scan)
+    fail = True
+    with pytest.raises(ConnectionError):
+        export_table(dynamodb, TABLE, str(tmp_path))
+    saved = checkpoint.ScanCheckpoint.load(TABLE)
+    assert saved.state["rows"] == 4
+    assert saved.state["segments"]["0"]["last_key"]
+
+    fail = False
+    requests.clear()
+    output, total = export_table(dynamodb, TABLE, str(tmp_path))
+
+    # La segunda ejecución sigue desde la última clave y el CSV no repite ni pierde filas
+    assert requests[0]["ExclusiveStartKey"] == saved.state["segments"]["0"]["last_key"]
+    assert total == 5
+    assert sorted(row["order_id"] for row in read_rows(output)) == [f"o{number}" for number in range(5)]
+    assert not os.path.exists(saved.path)
+    assert glob.glob(str(tmp_path / "*.spill")) == []
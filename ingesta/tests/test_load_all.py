@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import pytest
+import load_all
+from common import transfer
+from conftest import BUCKET
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def loader(s3, monkeypatch):
+    # El cliente de la prueba en lugar del compartido del proceso y un ajuste de concurrencia nuevo
+    monkeypatch.setattr(load_all, "aws_client", lambda *args, **kwargs: s3)
+    monkeypatch.setattr(transfer, "_tuner", None)
+    os.makedirs("exported_data")
+    return load_all
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as target:
+        target.write(content)
+
+
+def body(s3, key):
+    return s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+
+
+def count_uploads(monkeypatch, loader):
+    calls = []
+    upload_file = loader.upload_file
+
+    def counting_upload_file(s3, file_path, bucket, key, **kwargs):
+        calls.append(key)
+        return upload_file(s3, file_path, bucket, key, **kwargs)
+
+    monkeypatch.setattr(loader, "upload_file", counting_upload_file)
+    return calls
+
+
+def test_uploads_tables_and_skips_unchanged(loader, s3, monkeypatch):
+    large = bytes(range(256)) * (20 * MB // 256)
+    write("exported_data/pf_ordenes.csv", b"tenant_id;order_id\nwong;o1\n")
+    write("exported_data/pf_pagos.csv", large)
+    write("exported_data/pf_ordenes.delta.20261018T000000.csv", b"tenant_id;order_id\nwong;o2\n")
+
+    assert loader.ingest_all() is True
+    assert body(s3, "ordenes/pf_ordenes.csv") == b"tenant_id;order_id\nwong;o1\n"
+    assert body(s3, "pagos/pf_pagos.csv") == large
+    assert body(s3, "deltas/ordenes/pf_ordenes.delta.20261018T000000.csv") == b"tenant_id;order_id\nwong;o2\n"
+    # El delta subido se retira del disco
+    assert not os.path.exists("exported_data/pf_ordenes.delta.20261018T000000.csv")
+
+    # Segunda ejecución: el manifiesto tiene los mismos hashes y no se sube nada
+    calls = count_uploads(monkeypatch, loader)
+    assert loader.ingest_all() is True
+    assert calls == []
+
+    write("exported_data/pf_ordenes.csv", b"tenant_id;order_id\nwong;o1\nwong;o3\n")
+    assert loader.ingest_all() is True
+    assert calls == ["ordenes/pf_ordenes.csv"]
+
+
+def test_concurrency_is_shared_between_files(loader, s3, monkeypatch):
+    monkeypatch.setattr(loader, "LOAD_CONCURRENCY", 2)
+    for table_name in ("pf_pagos", "pf_ordenes", "pf_usuarios"):
+        write(f"exported_data/{table_name}.csv", b"x" * (20 * MB))
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+    upload_part = s3.upload_part
+
+    def tracking_upload_part(**kwargs):
+        with lock:
+            in_flight.append(kwargs["PartNumber"])
+            peak.append(len(in_flight))
+        try:
+            time.sleep(0.01)
+            return upload_part(**kwargs)
+        finally:
+            with lock:
+                in_flight.pop()
+
+    monkeypatch.setattr(s3, "upload_part", tracking_upload_part)
+    assert loader.ingest_all() is True
+    # 3 archivos de 3 partes, nunca más de 2 peticiones a la vez entre todos
+    assert len(peak) == 9
+    assert max(peak) <= 2
+
+
+def test_failed_upload_fails_the_stage(loader, s3, monkeypatch):
+    write("exported_data/pf_ordenes.csv", b"tenant_id;order_id\nwong;o1\n")
+    upload_file = loader.upload_file
+
+    def failing_upload_file(*args, **kwargs):
+        raise OSError("sin conexión")
+
+    monkeypatch.setattr(loader, "upload_file", failing_upload_file)
+    assert loader.ingest_all() is False
+    # Lo que no se subió no entra en el manifiesto: se vuelve a intentar en la siguiente ejecución
+    monkeypatch.setattr(loader, "upload_file", upload_file)
+    assert loader.ingest_all() is True
+    assert body(s3, "ordenes/pf_ordenes.csv") == b"tenant_id;order_id\nwong;o1\n"
+
+
+def test_missing_directory_fails(s3, monkeypatch):
+    monkeypatch.setattr(load_all, "aws_client", lambda *args, **kwargs: s3)
+    assert load_all.ingest_all() is False
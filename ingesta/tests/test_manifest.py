@@ -0,0 +1,43 @@
+import json
+import os
+from common.manifest import UploadManifest
+from conftest import BUCKET
+
+KEY = "ordenes/pf_ordenes.csv"
+
+
+def write(path, content):
+    with open(path, "wb") as target:
+        target.write(content)
+    return str(path)
+
+
+def test_manifest_skips_unchanged_and_recovers_from_s3(s3, tmp_path):
+    file_path = write(tmp_path / "pf_ordenes.csv", b"tenant_id;order_id\nwong;o1\n")
+    manifest = UploadManifest.load(s3, BUCKET, "ordenes", "pf_ordenes")
+    assert manifest.changed(file_path, KEY)
+    manifest.uploaded(KEY)
+    manifest.save()
+
+    # Copia en S3 junto a la tabla (ignorada por Athena por el "_")
+    remote = json.loads(s3.get_object(Bucket=BUCKET, Key="ordenes/_manifest.json")["Body"].read())
+    assert list(remote) == [KEY]
+
+    # Sin estado local (otra máquina, contenedor nuevo) se recupera el de S3
+    os.remove(manifest.path)
+    manifest = UploadManifest.load(s3, BUCKET, "ordenes", "pf_ordenes")
+    assert not manifest.changed(file_path, KEY)
+
+    write(tmp_path / "pf_ordenes.csv", b"tenant_id;order_id\nwong;o1\nwong;o2\n")
+    assert manifest.changed(file_path, KEY)
+
+
+def test_changed_but_not_uploaded_is_not_recorded(s3, tmp_path):
+    file_path = write(tmp_path / "pf_ordenes.csv", b"tenant_id;order_id\nwong;o1\n")
+    manifest = UploadManifest.load(s3, BUCKET, "ordenes", "pf_ordenes")
+    assert manifest.changed(file_path, KEY)
+    # La subida falló: no se llama a uploaded() y la próxima ejecución lo vuelve a subir
+    manifest.save()
+
+    manifest = UploadManifest.load(s3, BUCKET, "ordenes", "pf_ordenes")
+    assert manifest.changed(file_path, KEY)
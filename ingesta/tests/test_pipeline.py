@@ -0,0 +1,91 @@
+import threading
+import time
+import pytest
+import pipeline
+from pipeline import build_stages, run_all, run_pipeline, run_stage, topological_order
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    # El estado del pipeline (state/pipeline.json) en un directorio temporal
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "PIPELINE_RETRIES", 0)
+    monkeypatch.setattr(pipeline, "PIPELINE_TABLES", ["pf_ordenes", "pf_pagos", "pf_usuarios"])
+    return build_stages(pipeline.PIPELINE_TABLES)
+
+
+def fake_stages(monkeypatch, failing=()):
+    # Sustituye la ejecución de cada etapa; registra el orden y la concurrencia por recurso
+    calls = []
+    running = {"dynamodb": 0, "s3": 0}
+    peak = {"dynamodb": 0, "s3": 0}
+    lock = threading.Lock()
+
+    def fake_run_stage(name, stage, args, isolation=None):
+        with lock:
+            calls.append((name, list(args)))
+            running[stage["resource"]] += 1
+            peak[stage["resource"]] = max(peak[stage["resource"]], running[stage["resource"]])
+        time.sleep(0.02)
+        with lock:
+            running[stage["resource"]] -= 1
+        if name in failing:
+            raise RuntimeError("código de salida 1 tras 1 intentos")
+        return 1
+
+    monkeypatch.setattr(pipeline, "run_stage", fake_run_stage)
+    return calls, peak
+
+
+def test_topological_order_rejects_cycles_and_unknown_dependencies(stages):
+    order, _ = topological_order(stages)
+    for table in pipeline.PIPELINE_TABLES:
+        assert order.index(f"pull:{table}") < order.index(f"load:{table}")
+
+    stages["pull:pf_ordenes"]["after"] = ["load:pf_ordenes"]
+    with pytest.raises(ValueError):
+        topological_order(stages)
+    with pytest.raises(ValueError):
+        topological_order({"load:x": {"after": ["pull:x"]}})
+
+
+def test_loads_wait_for_their_pull_and_share_the_s3_limit(stages, monkeypatch):
+    monkeypatch.setitem(pipeline.RESOURCE_LIMITS, "s3", 1)
+    calls, peak = fake_stages(monkeypatch)
+
+    status, timings, _ = run_pipeline(stages, ["--last-days", "1"])
+
+    assert set(status.values()) == {"ok"}
+    names = [name for name, _ in calls]
+    for table in pipeline.PIPELINE_TABLES:
+        assert timings[f"pull:{table}"]["end"] <= timings[f"load:{table}"]["start"]
+        assert names.index(f"pull:{table}") < names.index(f"load:{table}")
+    assert peak["s3"] == 1
+    # Los argumentos de exportación solo van a las extracciones
+    assert all(args == (["--last-days", "1"] if name.startswith("pull:") else []) for name, args in calls)
+
+
+def test_failed_pull_skips_its_load_and_resume_reruns_only_that(stages, monkeypatch):
+    calls, _ = fake_stages(monkeypatch, failing={"pull:pf_pagos"})
+    assert run_all([]) is False
+    state = pipeline.load_state()["stages"]
+    assert state["pull:pf_pagos"]["status"] == "failed"
+    assert state["load:pf_pagos"]["status"] == "skipped"
+    assert state["load:pf_ordenes"]["status"] == "ok"
+
+    calls, _ = fake_stages(monkeypatch)
+    assert run_all(["--resume"]) is True
+    assert sorted(name for name, _ in calls) == ["load:pf_pagos", "pull:pf_pagos"]
+    assert all(entry["status"] == "ok" for entry in pipeline.load_state()["stages"].values())
+
+
+def test_run_stage_retries_only_the_failing_stage(monkeypatch):
+    monkeypatch.setattr(pipeline, "PIPELINE_RETRIES", 2)
+    monkeypatch.setattr(pipeline, "PIPELINE_RETRY_SECONDS", 0)
+    results = iter([(1, "error"), (1, "error"), (0, "")])
+    monkeypatch.setattr(pipeline, "run_in_thread", lambda stage, args: next(results))
+    assert run_stage("load:pf_ordenes", {"script": "t_ordenes/load_ordenes.py"}, [], isolation="thread") == 3
+
+    results = iter([(1, "error")] * 3)
+    with pytest.raises(RuntimeError):
+        run_stage("load:pf_ordenes", {"script": "t_ordenes/load_ordenes.py"}, [], isolation="thread")
@@ -0,0 +1,61 @@
+import csv
+import os
+import boto3
+import pytest
+from common import transfer
+from conftest import BUCKET, REGION
+from t_ordenes import load_ordenes, pull_ordenes
+from t_usuarios import load_usuarios, pull_usuarios
+
+
+def create_table(dynamodb, table_name, sort_key):
+    dynamodb.create_table(TableName=table_name,
+                          KeySchema=[{"AttributeName": "tenant_id", "KeyType": "HASH"},
+                                     {"AttributeName": sort_key, "KeyType": "RANGE"}],
+                          AttributeDefinitions=[{"AttributeName": "tenant_id", "AttributeType": "S"},
+                                                {"AttributeName": sort_key, "AttributeType": "S"}],
+                          BillingMode="PAY_PER_REQUEST")
+    return boto3.resource("dynamodb", region_name=REGION).Table(table_name)
+
+
+@pytest.fixture
+def tables(dynamodb, s3, monkeypatch):
+    monkeypatch.setattr(transfer, "_tuner", None)
+    usuarios = create_table(dynamodb, "pf_usuarios", "user_id")
+    ordenes = create_table(dynamodb, "pf_ordenes", "order_id")
+    usuarios.put_item(Item={"tenant_id": "wong", "user_id": "u1", "password": "x",
+                            "creation_date": "2026-10-01 10:00:00"})
+    ordenes.put_item(Item={"tenant_id": "wong", "order_id": "o1", "order_status": "PENDING"})
+    return usuarios, ordenes
+
+
+def read_rows(path, delimiter):
+    with open(path, newline="", encoding="utf-8") as source:
+        return list(csv.DictReader(source, delimiter=delimiter))
+
+
+def test_table_wrappers_pull_and_load(tables, s3):
+    # Cada tabla exporta con el delimitador de common/tables.py y sube bajo su prefijo
+    assert pull_usuarios.main([]) is True
+    assert pull_ordenes.main([]) is True
+    assert read_rows("exported_data/pf_usuarios.csv", ",")[0]["user_id"] == "u1"
+    assert read_rows("exported_data/pf_ordenes.csv", ";")[0]["order_id"] == "o1"
+
+    assert load_usuarios.main() is True
+    assert load_ordenes.main() is True
+    with open("exported_data/pf_ordenes.csv", "rb") as source:
+        assert s3.get_object(Bucket=BUCKET, Key="ordenes/pf_ordenes.csv")["Body"].read() == source.read()
+    keys = [entry["Key"] for entry in s3.list_objects_v2(Bucket=BUCKET)["Contents"]]
+    assert "usuarios/pf_usuarios.csv" in keys
+    assert "usuarios/_manifest.json" in keys
+
+
+def test_load_without_export_fails(s3):
+    assert load_ordenes.main() is False
+    os.makedirs("exported_data")
+    # Directorio sin nada de la tabla: no hay nada que subir
+    assert load_ordenes.main() is True
+
+
+def test_pull_of_missing_table_fails(dynamodb):
+    assert pull_ordenes.main([]) is False
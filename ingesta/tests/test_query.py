@@ -0,0 +1,57 @@
+import csv
+from datetime import datetime
+import boto3
+import export_all
+from common.export import export_table
+from common.query import resolve_query
+from conftest import REGION
+
+NOW = datetime(2026, 10, 18, 12, 30)
+
+
+def test_last_days_compares_dates_only():
+    query = resolve_query("pf_usuarios", ["--last-days", "7"], now=NOW)
+    assert query["since"] == "2026-10-11"
+    assert query["date_field"] == "creation_date"
+
+
+def test_last_days_keeps_boundary_day_with_space_separated_times(dynamodb, tmp_path):
+    # pf_usuarios guarda creation_date como "%Y-%m-%d %H:%M:%S" (fakeData/usuarios.py)
+    dynamodb.create_table(TableName="pf_usuarios",
+                          KeySchema=[{"AttributeName": "tenant_id", "KeyType": "HASH"},
+                                     {"AttributeName": "user_id", "KeyType": "RANGE"}],
+                          AttributeDefinitions=[{"AttributeName": "tenant_id", "AttributeType": "S"},
+                                                {"AttributeName": "user_id", "AttributeType": "S"}],
+                          BillingMode="PAY_PER_REQUEST")
+    table = boto3.resource("dynamodb", region_name=REGION).Table("pf_usuarios")
+    table.put_item(Item={"tenant_id": "wong", "user_id": "u1", "creation_date": "2026-10-11 08:00:00"})
+    table.put_item(Item={"tenant_id": "wong", "user_id": "u2", "creation_date": "2026-10-17 20:00:00"})
+    table.put_item(Item={"tenant_id": "wong", "user_id": "u3", "creation_date": "2026-10-10 23:59:59"})
+
+    query = resolve_query("pf_usuarios", ["--tenants", "wong", "--last-days", "7"], now=NOW)
+    output, total = export_table(dynamodb, "pf_usuarios", str(tmp_path), delimiter=",", query=query)
+
+    with open(output, newline="", encoding="utf-8") as source:
+        users = sorted(row["user_id"] for row in csv.DictReader(source))
+    assert total == 2
+    assert users == ["u1", "u2"]
+
+
+def test_export_all_rejects_options_some_tables_cannot_use(monkeypatch):
+    monkeypatch.setattr(export_all, "EXPORT_TABLES", ["pf_ordenes", "pf_productos"])
+
+    # pf_productos no tiene atributo de fecha ni order_id: se rechaza antes de leer nada
+    _, errors = export_all.resolve_options(["--since", "2026-10-01"])
+    assert len(errors) == 1 and "pf_productos" in errors[0]
+    _, errors = export_all.resolve_options(["--columns", "tenant_id,order_id"])
+    assert errors == ["La tabla 'pf_productos' no tiene las columnas: order_id."]
+    assert export_all.export_all_tables(["--columns", "tenant_id,order_id"]) is False
+
+    # Acotadas con EXPORT_TABLES, las mismas opciones son válidas
+    monkeypatch.setattr(export_all, "EXPORT_TABLES", ["pf_ordenes"])
+    options, errors = export_all.resolve_options(["--columns", "tenant_id,order_id,user_info.pais",
+                                                  "--since", "2026-10-01"])
+    assert errors == []
+    columns, query = options["pf_ordenes"]
+    assert columns == ["tenant_id", "order_id", "user_info.pais"]
+    assert query["since"] == "2026-10-01"
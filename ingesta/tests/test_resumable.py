@@ -0,0 +1,91 @@
+import os
+import pytest
+from botocore.exceptions import ClientError
+from common import resumable
+from common.resumable import UploadState, resumable_upload
+from conftest import BUCKET
+
+MB = 1024 * 1024
+KEY = "pagos/pf_pagos.csv"
+PART_SIZE = 5 * MB
+
+
+@pytest.fixture
+def source(aws, tmp_path, monkeypatch):
+    monkeypatch.setattr(resumable, "UPLOAD_PART_RETRIES", 0)
+    path = tmp_path / "pf_pagos.csv"
+    # 4 partes de 5 MB (la última más corta), cada una con contenido distinto
+    with open(path, "wb") as target:
+        for number in range(18):
+            target.write(bytes([number]) * MB)
+    return str(path)
+
+
+def fail_part(s3, monkeypatch, failing):
+    sent = []
+    # El método del cliente, no el sustituto de una llamada anterior
+    upload_part = type(s3).upload_part.__get__(s3)
+
+    def tracking_upload_part(**kwargs):
+        sent.append(kwargs["PartNumber"])
+        if kwargs["PartNumber"] in failing:
+            raise ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "UploadPart")
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(s3, "upload_part", tracking_upload_part)
+    return sent
+
+
+def read(path):
+    with open(path, "rb") as source:
+        return source.read()
+
+
+def test_interrupted_upload_resumes_with_missing_parts(s3, source, monkeypatch):
+    sent = fail_part(s3, monkeypatch, {3})
+    with pytest.raises(ClientError):
+        resumable_upload(s3, source, BUCKET, KEY, PART_SIZE, concurrency=1)
+    assert sorted(sent) == [1, 2, 3, 4]
+    # UploadId y partes completadas quedan guardados para la siguiente ejecución
+    state = UploadState.load(BUCKET, KEY).state
+    assert sorted(state["parts"]) == ["1", "2", "4"]
+
+    sent = fail_part(s3, monkeypatch, set())
+    assert resumable_upload(s3, source, BUCKET, KEY, PART_SIZE, concurrency=2) == (4, 1)
+    # Solo se envía la parte que S3 no tenía (ListParts) y el objeto queda íntegro
+    assert sent == [3]
+    assert s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read() == read(source)
+    assert not os.path.exists(UploadState.load(BUCKET, KEY).path)
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_changed_file_restarts_upload(s3, source, monkeypatch):
+    fail_part(s3, monkeypatch, {2})
+    with pytest.raises(ClientError):
+        resumable_upload(s3, source, BUCKET, KEY, PART_SIZE, concurrency=1)
+    first_upload = UploadState.load(BUCKET, KEY).state["upload_id"]
+
+    with open(source, "ab") as target:
+        target.write(b"fila nueva\n")
+    sent = fail_part(s3, monkeypatch, set())
+    assert resumable_upload(s3, source, BUCKET, KEY, PART_SIZE, concurrency=2) == (4, 4)
+
+    # La subida anterior se aborta y la nueva sube todas las partes del contenido actual
+    assert sorted(sent) == [1, 2, 3, 4]
+    assert s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read() == read(source)
+    uploads = s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+    assert first_upload not in [upload["UploadId"] for upload in uploads]
+
+
+def test_expired_upload_restarts(s3, source, monkeypatch):
+    fail_part(s3, monkeypatch, {2})
+    with pytest.raises(ClientError):
+        resumable_upload(s3, source, BUCKET, KEY, PART_SIZE, concurrency=1)
+    # La subida ya no existe en S3 (p. ej. la borró una regla de ciclo de vida)
+    upload_id = UploadState.load(BUCKET, KEY).state["upload_id"]
+    s3.abort_multipart_upload(Bucket=BUCKET, Key=KEY, UploadId=upload_id)
+
+    sent = fail_part(s3, monkeypatch, set())
+    assert resumable_upload(s3, source, BUCKET, KEY, PART_SIZE, concurrency=2) == (4, 4)
+    assert sorted(sent) == [1, 2, 3, 4]
+    assert s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read() == read(source)
@@ -0,0 +1,89 @@
+import csv
+import io
+import pytest
+from botocore.exceptions import ClientError
+from common.s3_stream import S3MultipartSink
+from conftest import BUCKET
+
+MB = 1024 * 1024
+KEY = "ordenes/pf_ordenes.csv"
+
+
+def make_rows(count):
+    return [{"tenant_id": "wong", "order_id": f"order_{number}", "observations": "x" * 1000}
+            for number in range(count)]
+
+
+def expected_csv(rows):
+    buffer = io.StringIO(newline="")
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), delimiter=";")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream(sink, rows):
+    # Igual que export_table: si la escritura falla se aborta la subida, si no se completa
+    try:
+        for row in rows:
+            sink.write(row)
+    except BaseException:
+        sink.abort()
+        raise
+    sink.close()
+
+
+def open_uploads(s3):
+    return s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+
+
+def test_multipart_export_matches_rows(s3):
+    rows = make_rows(12000)
+    sink = S3MultipartSink(s3, BUCKET, KEY)
+    # Partes del mínimo que admite S3 para que ~12 MB den varias
+    sink.part_size = 5 * MB
+    stream(sink, rows)
+
+    assert len(sink._futures) == 3
+    body = s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read()
+    assert body == expected_csv(rows)
+    assert sink.rows == len(rows)
+    assert sink.uploaded_bytes == len(body)
+    assert open_uploads(s3) == []
+
+
+def test_small_export_uses_single_put(s3):
+    rows = make_rows(10)
+    sink = S3MultipartSink(s3, BUCKET, KEY)
+    stream(sink, rows)
+
+    assert sink._futures == []
+    assert s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read() == expected_csv(rows)
+
+
+def test_empty_export_uploads_nothing(s3):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"previous")
+    sink = S3MultipartSink(s3, BUCKET, KEY)
+    stream(sink, [])
+
+    # El CSV anterior sigue intacto
+    assert s3.get_object(Bucket=BUCKET, Key=KEY)["Body"].read() == b"previous"
+    assert open_uploads(s3) == []
+
+
+def test_failed_part_aborts_upload(s3, monkeypatch):
+    upload_part = s3.upload_part
+
+    def failing_upload_part(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "UploadPart")
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(s3, "upload_part", failing_upload_part)
+    sink = S3MultipartSink(s3, BUCKET, KEY)
+    sink.part_size = 5 * MB
+    with pytest.raises(ClientError):
+        stream(sink, make_rows(12000))
+
+    assert open_uploads(s3) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
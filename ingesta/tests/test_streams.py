@@ -0,0 +1,103 @@
+import csv
+import glob
+import os
+import boto3
+import pytest
+from common import streams as cdc
+from common.streams import export_changes, has_pending_changes, load_stream_state
+from conftest import REGION
+
+TABLE = "pf_ordenes"
+
+
+@pytest.fixture
+def table(dynamodb, monkeypatch):
+    # Un shard abierto se da por alcanzado sin esperar entre lecturas vacías
+    monkeypatch.setattr(cdc, "STREAM_POLL_SECONDS", 0)
+    dynamodb.create_table(TableName=TABLE,
+                          KeySchema=[{"AttributeName": "tenant_id", "KeyType": "HASH"},
+                                     {"AttributeName": "order_id", "KeyType": "RANGE"}],
+                          AttributeDefinitions=[{"AttributeName": "tenant_id", "AttributeType": "S"},
+                                                {"AttributeName": "order_id", "AttributeType": "S"}],
+                          BillingMode="PAY_PER_REQUEST",
+                          StreamSpecification={"StreamEnabled": True, "StreamViewType": "NEW_AND_OLD_IMAGES"})
+    return boto3.resource("dynamodb", region_name=REGION).Table(TABLE)
+
+
+def read_changes(path):
+    with open(path, newline="", encoding="utf-8") as changes_file:
+        return list(csv.DictReader(changes_file, delimiter=";"))
+
+
+def test_changes_map_operations(table, dynamodb, streams, tmp_path):
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o1", "order_status": "PENDING"})
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o2", "order_status": "PENDING"})
+    table.update_item(Key={"tenant_id": "wong", "order_id": "o1"}, UpdateExpression="SET order_status = :s",
+                      ExpressionAttributeValues={":s": "APPROVED PAYMENT"})
+    table.delete_item(Key={"tenant_id": "wong", "order_id": "o2"})
+
+    output, total = export_changes(dynamodb, streams, TABLE, str(tmp_path))
+
+    rows = read_changes(output)
+    assert total == 4
+    assert [(row["_op"], row["order_id"]) for row in rows] == [
+        ("insert", "o1"), ("insert", "o2"), ("modify", "o1"), ("remove", "o2")]
+    assert rows[2]["order_status"] == "APPROVED PAYMENT"
+    # Una baja solo lleva la clave
+    assert rows[3]["order_status"] == ""
+    assert all(row["_sequence_number"] for row in rows)
+
+
+def test_resumes_after_last_sequence_number(table, dynamodb, streams, tmp_path):
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o1"})
+    first_output, _ = export_changes(dynamodb, streams, TABLE, str(tmp_path))
+    os.remove(first_output)
+    state = load_stream_state(TABLE)
+    assert any(shard["sequence_number"] for shard in state["shards"].values())
+
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o2"})
+    output, total = export_changes(dynamodb, streams, TABLE, str(tmp_path))
+    assert total == 1
+    assert [(row["_op"], row["order_id"]) for row in read_changes(output)] == [("insert", "o2")]
+
+    # Sin cambios nuevos no se escribe archivo
+    os.remove(output)
+    assert export_changes(dynamodb, streams, TABLE, str(tmp_path)) == (None, 0)
+    assert os.listdir(tmp_path / "state") == ["pf_ordenes.stream.json"]
+    assert glob.glob(str(tmp_path / "*.csv*")) == []
+
+
+def test_has_pending_changes(table, dynamodb, streams, tmp_path):
+    # Sin estado previo todo el stream está pendiente
+    assert has_pending_changes(dynamodb, streams, TABLE)
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o1"})
+    export_changes(dynamodb, streams, TABLE, str(tmp_path))
+    assert not has_pending_changes(dynamodb, streams, TABLE)
+
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o2"})
+    assert has_pending_changes(dynamodb, streams, TABLE)
+    # El sondeo no avanza la posición: la exportación sigue viendo el cambio
+    _, total = export_changes(dynamodb, streams, TABLE, str(tmp_path))
+    assert total == 1
+
+
+def test_failure_leaves_no_spill_or_partial_csv(table, dynamodb, streams, tmp_path, monkeypatch):
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o1"})
+    table.put_item(Item={"tenant_id": "wong", "order_id": "o2"})
+    change_row = cdc.change_row
+
+    def failing_change_row(record, decode):
+        if record["dynamodb"]["Keys"]["order_id"]["S"] == "o2":
+            raise RuntimeError("fallo simulado")
+        return change_row(record, decode)
+
+    monkeypatch.setattr(cdc, "change_row", failing_change_row)
+    with pytest.raises(RuntimeError):
+        export_changes(dynamodb, streams, TABLE, str(tmp_path))
+
+    assert glob.glob(str(tmp_path / "*.csv*")) == []
+    assert load_stream_state(TABLE) == {}
+    # La siguiente ejecución relee ambos cambios
+    monkeypatch.setattr(cdc, "change_row", change_row)
+    _, total = export_changes(dynamodb, streams, TABLE, str(tmp_path))
+    assert total == 2
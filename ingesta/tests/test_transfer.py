@@ -0,0 +1,48 @@
+import os
+import pytest
+from common import transfer
+from common.transfer import ConcurrencyTuner, upload_file
+from conftest import BUCKET
+
+MB = 1024 * 1024
+KEY = "ordenes/pf_ordenes.csv"
+
+
+def write_file(path, size):
+    # Contenido distinto en cada MB para que una parte desordenada no pase desapercibida
+    with open(path, "wb") as target:
+        for number in range(size // MB):
+            target.write(bytes([number % 256]) * MB)
+    return str(path)
+
+
+@pytest.fixture
+def tuner(aws, monkeypatch):
+    monkeypatch.setattr(transfer, "UPLOAD_CONCURRENCY", "auto")
+    monkeypatch.setattr(transfer, "UPLOAD_MAX_CONCURRENCY", 64)
+    tuner = ConcurrencyTuner()
+    monkeypatch.setattr(transfer, "_tuner", tuner)
+    return tuner
+
+
+def test_fewer_parts_than_threads_keeps_learned_concurrency(s3, tuner, tmp_path):
+    tuner.concurrency = 32
+    file_path = write_file(tmp_path / "pf_ordenes.csv", 20 * MB)
+
+    upload_file(s3, file_path, BUCKET, KEY)
+
+    # 20 MB son 3 partes de 8 MB: se suben con 3 hilos y eso no dice nada de los 32
+    assert tuner.current() == 32
+    assert not os.path.exists(tuner.path)
+    assert s3.get_object(Bucket=BUCKET, Key=KEY)["ContentLength"] == 20 * MB
+
+
+def test_full_concurrency_upload_updates_tuner(s3, tuner, tmp_path):
+    tuner.concurrency = 2
+    file_path = write_file(tmp_path / "pf_ordenes.csv", 20 * MB)
+
+    upload_file(s3, file_path, BUCKET, KEY)
+
+    # Primera medición: mejora sobre 0 MB/s y se duplica
+    assert tuner.current() == 4
+    assert ConcurrencyTuner(tuner.path).current() == 4